@@ -0,0 +1 @@
+"""Dataset building, extraction and evaluation scripts, also importable as a package"""
@@ -1,17 +1,27 @@
-import requests
+import argparse
 import json
-import re
 import os
-from bs4 import BeautifulSoup
-import time
-from comprehensive_extraction_system import STATIC_PROMPTS, scrape_article
+from functools import partial
+from article_store import scrape_article
+from async_engine import AsyncExtractionEngine
+from chunking import article_token_budget, extract_within_budget
+from comprehensive_extraction_system import (
+    EXTRACTION_MAX_TOKENS, PROMPT_LAYOUT, STATIC_PROMPTS, add_runner_args, apply_runner_args, build_prompt,
+    print_runner_reports
+)
+from dedup import DEDUP_THRESHOLD, merge_argument_maps
+from json_extract import ARGUMENT_MAP_SCHEMA, is_answer_to, parse_argument_map
+from llm_client import get_client
+from scheduler import ModelAffinityScheduler
 
 MODELS = ["llama3.1", "llama3.2", "gemma2"]
 
 class ReActAgentMultiModel:
-    def __init__(self, model_name):
+    def __init__(self, model_name, prompt_layout=PROMPT_LAYOUT, map_reduce=False):
         self.model_name = model_name
-        self.llm_url = "http://localhost:11434/v1/chat/completions"
+        self.prompt_layout = prompt_layout
+        self.map_reduce = map_reduce
+        self.client = get_client()
         self.decision_log = []
         self.available_strategies = list(STATIC_PROMPTS.keys())
     
@@ -43,16 +53,12 @@ Options: baseline, few_shot, chain_of_thought, role_based, contrastive, structur
 
 Respond with ONLY the strategy name."""
 
-        payload = {
-            "model": self.model_name,
-            "messages": [{"role": "user", "content": reasoning_prompt}],
-            "temperature": 0.1,
-            "max_tokens": 50,
-        }
+        messages = [{"role": "user", "content": reasoning_prompt}]
         
         try:
-            resp = requests.post(self.llm_url, json=payload, timeout=30)
-            decision = resp.json()["choices"][0]["message"]["content"].strip().lower()
+            decision = self.client.chat(self.model_name, messages, temperature=0.1, max_tokens=50, timeout=30,
+                                        strategy="react_decide")
+            decision = decision.strip().lower()
             
             for strategy in self.available_strategies:
                 if strategy in decision:
@@ -72,45 +78,25 @@ Respond with ONLY the strategy name."""
         }
         return mapping.get(article_type, "baseline")
     
-    def _extract(self, text, strategy):
+    def _extract(self, text, strategy, cache=True):
+        config = STATIC_PROMPTS[strategy]
+        budget = article_token_budget(self.model_name, config["prompt"], EXTRACTION_MAX_TOKENS)
+        return extract_within_budget(text, budget, partial(self._extract_chunk, strategy=strategy, cache=cache),
+                                     self.map_reduce)
+    
+    def _extract_chunk(self, text, strategy, cache=True):
         config = STATIC_PROMPTS[strategy]
-        prompt = config["prompt"].format(text=text[:3500])
+        prompt = build_prompt(config["prompt"], text, self.prompt_layout)
         
-        payload = {
-            "model": self.model_name,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": config["temperature"],
-            "max_tokens": 1500,
-        }
+        messages = [{"role": "user", "content": prompt}]
         
         try:
-            resp = requests.post(self.llm_url, json=payload, timeout=90)
-            content = resp.json()["choices"][0]["message"]["content"]
-            
-            match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-            if not match:
-                return None
+            content = self.client.chat(self.model_name, messages, temperature=config["temperature"],
+                                       max_tokens=EXTRACTION_MAX_TOKENS, timeout=90, cache=cache,
+                                       early_stop=is_answer_to(prompt), strategy=strategy,
+                                       schema=ARGUMENT_MAP_SCHEMA, system="react")
             
-            arg_map = json.loads(match.group(0))
-            
-            for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-                if key not in arg_map:
-                    arg_map[key] = []
-                elif not isinstance(arg_map[key], list):
-                    arg_map[key] = [str(arg_map[key])]
-                
-                cleaned_items = []
-                for item in arg_map[key]:
-                    if isinstance(item, dict):
-                        cleaned_items.append(' '.join(str(v) for v in item.values() if v))
-                    elif isinstance(item, list):
-                        cleaned_items.append(' '.join(str(i) for i in item if i))
-                    else:
-                        cleaned_items.append(str(item))
-                
-                arg_map[key] = [item.strip() for item in cleaned_items if item and str(item).strip()]
-            
-            return arg_map
+            return parse_argument_map(content, self.client.uses_schema(self.model_name), prompt)
         except:
             return None
     
@@ -131,7 +117,8 @@ Respond with ONLY the strategy name."""
         
         for attempt in range(max_retries):
             strategy = self._decide_strategy(text, article_type)
-            result = self._extract(text, strategy)
+            # Retries are deliberate re-samples, so only the first attempt may be served from cache
+            result = self._extract(text, strategy, cache=(attempt == 0))
             
             if not result:
                 if attempt < max_retries - 1:
@@ -158,50 +145,35 @@ Respond with ONLY the strategy name."""
 class MultiAgentSystemMultiModel:
     """FIXED: Uses all 7 strategies, not just 4 specialist prompts"""
     
-    def __init__(self, model_name):
+    def __init__(self, model_name, prompt_layout=PROMPT_LAYOUT, map_reduce=False,
+                 dedup_threshold=DEDUP_THRESHOLD):
         self.model_name = model_name
-        self.llm_url = "http://localhost:11434/v1/chat/completions"
+        self.prompt_layout = prompt_layout
+        self.map_reduce = map_reduce
+        self.dedup_threshold = dedup_threshold
+        self.provenance = {}
+        self.client = get_client()
     
     def _extract_with_strategy(self, text, strategy_name):
         """Extract using one of the 7 strategies"""
         config = STATIC_PROMPTS[strategy_name]
-        prompt = config["prompt"].format(text=text[:3500])
+        budget = article_token_budget(self.model_name, config["prompt"], EXTRACTION_MAX_TOKENS)
+        return extract_within_budget(text, budget, partial(self._extract_chunk, strategy_name=strategy_name),
+                                     self.map_reduce)
+    
+    def _extract_chunk(self, text, strategy_name):
+        config = STATIC_PROMPTS[strategy_name]
+        prompt = build_prompt(config["prompt"], text, self.prompt_layout)
         
-        payload = {
-            "model": self.model_name,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": config["temperature"],
-            "max_tokens": 1500,
-        }
+        messages = [{"role": "user", "content": prompt}]
         
         try:
-            resp = requests.post(self.llm_url, json=payload, timeout=90)
-            content = resp.json()["choices"][0]["message"]["content"]
+            content = self.client.chat(self.model_name, messages, temperature=config["temperature"],
+                                       max_tokens=EXTRACTION_MAX_TOKENS, timeout=90, cache=True,
+                                       early_stop=is_answer_to(prompt), strategy=strategy_name,
+                                       schema=ARGUMENT_MAP_SCHEMA, system="multi_agent")
             
-            match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-            if not match:
-                return None
-            
-            arg_map = json.loads(match.group(0))
-            
-            for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-                if key not in arg_map:
-                    arg_map[key] = []
-                elif not isinstance(arg_map[key], list):
-                    arg_map[key] = [str(arg_map[key])]
-                
-                cleaned_items = []
-                for item in arg_map[key]:
-                    if isinstance(item, dict):
-                        cleaned_items.append(' '.join(str(v) for v in item.values() if v))
-                    elif isinstance(item, list):
-                        cleaned_items.append(' '.join(str(i) for i in item if i))
-                    else:
-                        cleaned_items.append(str(item))
-                
-                arg_map[key] = [item.strip() for item in cleaned_items if item and str(item).strip()]
-            
-            return arg_map
+            return parse_argument_map(content, self.client.uses_schema(self.model_name), prompt)
         except:
             return None
     
@@ -209,26 +181,44 @@ class MultiAgentSystemMultiModel:
         """Run 3 best strategies and aggregate results"""
         strategies_to_try = ["chain_of_thought", "few_shot", "recursive"]
         
-        all_results = {
-            "thesis": [],
-            "supporting_claims": [],
-            "counterarguments": [],
-            "evidence": []
-        }
-        
+        results = {}
         for strategy in strategies_to_try:
             result = self._extract_with_strategy(text, strategy)
             if result:
-                for key in all_results.keys():
-                    all_results[key].extend(result.get(key, []))
+                results[strategy] = result
         
-        # Deduplicate
-        for key in all_results:
-            all_results[key] = list(set(all_results[key]))
+        # Deduplicate paraphrases too, keeping strategy order and which strategies found each item
+        all_results, self.provenance = merge_argument_maps(results, self.dedup_threshold)
         
         return all_results
 
+def run_agents(article, model_name, prompt_layout=PROMPT_LAYOUT, map_reduce=False,
+               dedup_threshold=DEDUP_THRESHOLD):
+    """Run the ReAct agent and the multi-agent system for one article on one model"""
+    source_id = article["source_id"]
+    
+    react_agent = ReActAgentMultiModel(model_name, prompt_layout, map_reduce)
+    react_map = react_agent.process(article["text"], source_id)
+    
+    multiagent_system = MultiAgentSystemMultiModel(model_name, prompt_layout, map_reduce, dedup_threshold)
+    multiagent_map = multiagent_system.process(article["text"], source_id)
+    
+    return {
+        "react": dict(article, argument_map=react_map),
+        "decisions": react_agent.decision_log,
+        "multi_agent": dict(article, argument_map=multiagent_map),
+        "provenance": {"source_id": article["source_id"], "provenance": multiagent_system.provenance}
+    }
+
 def main():
+    parser = argparse.ArgumentParser(description="Run the ReAct and multi-agent systems on all models")
+    add_runner_args(parser, concurrency_help="Articles processed at once per model (match OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="Word and word-pair similarity at which multi-agent items are merged "
+                             "(1.0 = only identical text, ignoring case and whitespace)")
+    args = parser.parse_args()
+    apply_runner_args(args, MODELS)
+    
     print("\n" + "="*70)
     print("AGENTIC SYSTEMS WITH 3 MODELS (FIXED)")
     print("="*70 + "\n")
@@ -241,16 +231,13 @@ def main():
     
     print(f"✓ Loaded {len(gold_standard)} articles\n")
     
-    react_results = {model: [] for model in MODELS}
-    multiagent_results = {model: [] for model in MODELS}
-    all_decisions = []
-    
+    articles = []
     for idx, article in enumerate(gold_standard):
         source_id = article['source_id']
         url = article.get('url', '')
         title = article.get('title', '')
         
-        print(f"\n[{idx+1}/{len(gold_standard)}] {source_id}")
+        print(f"[{idx+1}/{len(gold_standard)}] {source_id}")
         print(f"   {title[:60]}...")
         
         if not url:
@@ -261,43 +248,47 @@ def main():
             print(f"   ❌ Scraping failed")
             continue
         
-        full_text = f"{title}\n{text}"
-        
+        articles.append({
+            "source_id": source_id,
+            "title": title,
+            "url": url,
+            "source": article.get('source', ''),
+            "topic": article.get('topic', ''),
+            "text": f"{title}\n{text}"
+        })
+    
+    # One job per (article, model); the scheduler drains each model before loading the next
+    jobs = []
+    for article in articles:
         for model_name in MODELS:
-            print(f"   🤖 {model_name}:")
-            
-            # ReAct Agent
-            print(f"      ReAct...", end="", flush=True)
-            react_agent = ReActAgentMultiModel(model_name)
-            react_map = react_agent.process(full_text, source_id)
-            react_results[model_name].append({
-                "source_id": source_id,
-                "title": title,
-                "url": url,
-                "source": article.get('source', ''),
-                "topic": article.get('topic', ''),
-                "text": full_text,
-                "argument_map": react_map
-            })
-            all_decisions.extend(react_agent.decision_log)
-            print(" ✓")
-            time.sleep(1)
-            
-            # Multi-Agent (FIXED)
-            print(f"      Multi-Agent...", end="", flush=True)
-            multiagent_system = MultiAgentSystemMultiModel(model_name)
-            multiagent_map = multiagent_system.process(full_text, source_id)
-            multiagent_results[model_name].append({
-                "source_id": source_id,
-                "title": title,
-                "url": url,
-                "source": article.get('source', ''),
-                "topic": article.get('topic', ''),
-                "text": full_text,
-                "argument_map": multiagent_map
+            jobs.append({
+                "model": model_name,
+                "run": partial(run_agents, article, model_name, args.prompt_layout, args.map_reduce,
+                               args.dedup_threshold)
             })
-            print(" ✓")
-            time.sleep(1)
+    
+    scheduler = ModelAffinityScheduler(max_resident_models=args.max_resident_models)
+    print(f"\n🤖 Running ReAct + Multi-Agent on {len(articles)} articles × {len(MODELS)} models...")
+    print(f"   Model switches: {scheduler.model_switches(jobs)} in article order → "
+          f"{len(scheduler.plan(jobs))} with model affinity")
+    engine = AsyncExtractionEngine(per_model_concurrency=args.concurrency_per_model, scheduler=scheduler,
+                                   metrics=get_client().concurrency_snapshot)
+    outputs = engine.run(jobs)
+    print(f"   ✅ Completed in {engine.elapsed:.1f}s")
+    
+    # Collect in the original article → model order so the saved files do not change
+    react_results = {model: [] for model in MODELS}
+    multiagent_results = {model: [] for model in MODELS}
+    provenance_results = {model: [] for model in MODELS}
+    all_decisions = []
+    
+    for job, output in zip(jobs, outputs):
+        if output is None:
+            continue
+        react_results[job["model"]].append(output["react"])
+        multiagent_results[job["model"]].append(output["multi_agent"])
+        provenance_results[job["model"]].append(output["provenance"])
+        all_decisions.extend(output["decisions"])
     
     # Save
     print(f"\n{'='*70}")
@@ -305,7 +296,10 @@ def main():
     print("="*70)
     
     output_dir = os.path.join(script_dir, 'data', 'processed', 'agentic_models')
-    os.makedirs(output_dir, exist_ok=True)
+    # Provenance goes in a subdirectory so the result files keep their format
+    # and the comparison scripts' *.json glob does not pick it up
+    provenance_dir = os.path.join(output_dir, 'provenance')
+    os.makedirs(provenance_dir, exist_ok=True)
     
     for model_name in MODELS:
         with open(os.path.join(output_dir, f'{model_name}_react_agent.json'), 'w', encoding='utf-8') as f:
@@ -315,10 +309,15 @@ def main():
         with open(os.path.join(output_dir, f'{model_name}_multi_agent.json'), 'w', encoding='utf-8') as f:
             json.dump(multiagent_results[model_name], f, indent=2, ensure_ascii=False)
         print(f"✓ {model_name} Multi-Agent: {len(multiagent_results[model_name])}")
+        
+        with open(os.path.join(provenance_dir, f'{model_name}_multi_agent.json'), 'w', encoding='utf-8') as f:
+            json.dump(provenance_results[model_name], f, indent=2, ensure_ascii=False)
     
     with open(os.path.join(output_dir, 'react_agent_decisions.json'), 'w', encoding='utf-8') as f:
         json.dump(all_decisions, f, indent=2)
     
+    print_runner_reports()
+    
     print(f"\n✅ COMPLETE!\n")
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from html_extract import extract_title_and_paragraphs
+from http_fetch import get_fetch_stats, open_page
+from web_archive import get_web_archive, mount_archive
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+ARTICLE_STORE_PATH = os.environ.get(
+    "ARTICLE_STORE_PATH", os.path.join(_script_dir, 'data', 'cache', 'articles.sqlite')
+)
+# Hours before a stored page is revalidated with the server (0 = keep forever)
+ARTICLE_TTL_HOURS = float(os.environ.get("ARTICLE_TTL_HOURS", "0"))
+# Hours before a failed fetch is retried
+ARTICLE_RETRY_HOURS = float(os.environ.get("ARTICLE_RETRY_HOURS", "24"))
+
+# use        - serve stored pages, revalidate only those older than the TTL
+# revalidate - conditional GET (ETag / Last-Modified) for every stored page
+# refresh    - fetch everything again
+# offline    - never touch the network
+ARTICLE_STORE_MODE = os.environ.get("ARTICLE_STORE_MODE", "use")
+ARTICLE_STORE_MODES = ["use", "revalidate", "refresh", "offline"]
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+FETCH_TIMEOUT = 10
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def canonical_url(url):
+    """Normalize a URL so trivially different spellings share one entry
+
+    Lower-cases the scheme and host, drops the fragment, default ports,
+    tracking parameters and a trailing slash, and sorts the query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith(TRACKING_PARAMS))
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+def parse_article_html(html):
+    """(title, text) of a news page: the <title> and the first 15 paragraphs
+
+    Returns (None, None) when there is too little paragraph text to be an
+    article (paywalls, consent pages, video pages).
+    """
+    title, paragraphs = extract_title_and_paragraphs(html, max_paragraphs=15)
+    content = " ".join(paragraphs)
+    if len(content) < 200:
+        return None, None
+    return title, content
+
+# ============================================================================
+# PERSISTENT ARTICLE STORE
+# ============================================================================
+
+class ArticleStore:
+    """SQLite store of fetched pages, keyed by canonical URL
+
+    Keeps the raw HTML, the extracted title and text, when the page was
+    fetched and last validated, and the ETag / Last-Modified validators, so
+    a stale page is revalidated with a conditional GET instead of being
+    downloaded again. Every run reads the stored text, so all
+    configurations see byte-identical input.
+    """
+
+    def __init__(self, path=ARTICLE_STORE_PATH, ttl_hours=ARTICLE_TTL_HOURS, mode=ARTICLE_STORE_MODE,
+                 retry_hours=ARTICLE_RETRY_HOURS):
+        if mode not in ARTICLE_STORE_MODES:
+            raise ValueError(f"Unknown article store mode '{mode}', expected one of {ARTICLE_STORE_MODES}")
+
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.retry_after = retry_hours * 3600
+        self.mode = mode
+        self.session = mount_archive(requests.Session())
+        self.counts = {"hits": 0, "fetched": 0, "revalidated": 0, "not_modified": 0, "failed": 0, "stale": 0}
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                requested_url TEXT,
+                status INTEGER,
+                html TEXT,
+                title TEXT,
+                text TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                validated_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        """Stored record for url as a dict, or None"""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM articles WHERE url = ?", (canonical_url(url),)).fetchone()
+        return dict(row) if row is not None else None
+
+    def scrape(self, url):
+        """(title, text) for url, from the store when possible; (None, None) on failure"""
+        record = self.get(url)
+        now = time.time()
+
+        if record is not None and self.mode != "refresh":
+            failed = record["text"] is None
+            age = now - record["validated_at"]
+            fresh = age < self.retry_after if failed else (not self.ttl or age < self.ttl)
+            if self.mode == "offline" or (self.mode == "use" and fresh):
+                self._count("hits")
+                return (None, None) if failed else (record["title"], record["text"])
+        elif record is None and self.mode == "offline":
+            self._count("failed")
+            return None, None
+
+        return self._fetch(url, record)
+
+    def _fetch(self, url, record):
+        headers = dict(HEADERS)
+        conditional = record is not None and record["text"] is not None and self.mode != "refresh"
+        if conditional:
+            if record["etag"]:
+                headers["If-None-Match"] = record["etag"]
+            if record["last_modified"]:
+                headers["If-Modified-Since"] = record["last_modified"]
+
+        now = time.time()
+        try:
+            response = self.session.get(url, headers=headers, timeout=FETCH_TIMEOUT, stream=True)
+            if conditional and response.status_code == 304:
+                response.close()
+                self._count("not_modified")
+                self._touch(url, now)
+                return record["title"], record["text"]
+            # The raw HTML is stored, so the page is read whole, up to the size cap
+            html = open_page(response).text()
+        except requests.RequestException as e:
+            status = e.response.status_code if getattr(e, "response", None) is not None else None
+            if record is not None and record["text"] is not None:
+                # Serve the stale copy rather than lose the article
+                self._count("stale")
+                return record["title"], record["text"]
+            self._count("failed")
+            self._save(url, status, None, None, None, None, None, now)
+            return None, None
+
+        try:
+            title, text = parse_article_html(html)
+        except Exception:
+            title, text = None, None
+        self._count("revalidated" if conditional else "fetched")
+        if text is None:
+            self._count("failed")
+        self._save(url, response.status_code, html, title, text,
+                   response.headers.get("ETag"), response.headers.get("Last-Modified"), now)
+        return title, text
+
+    def _save(self, url, status, html, title, text, etag, last_modified, now):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonical_url(url), url, status, html, title, text, etag, last_modified, now, now)
+            )
+            self.conn.commit()
+
+    def _touch(self, url, now):
+        with self._lock:
+            self.conn.execute("UPDATE articles SET validated_at = ? WHERE url = ?", (now, canonical_url(url)))
+            self.conn.commit()
+
+    def _count(self, event):
+        with self._lock:
+            self.counts[event] += 1
+
+    def stats(self):
+        with self._lock:
+            entries, with_text = self.conn.execute(
+                "SELECT COUNT(*), COUNT(text) FROM articles"
+            ).fetchone()
+            counts = dict(self.counts)
+        return dict(counts, mode=self.mode, entries=entries, articles=with_text)
+
+    def print_report(self):
+        s = self.stats()
+        print(f"\nArticle store ({s['mode']}): {s['hits']} served from store, {s['fetched']} fetched, "
+              f"{s['revalidated']} re-downloaded / {s['not_modified']} not modified on revalidation, "
+              f"{s['stale']} stale served, {s['failed']} failed; {s['articles']} articles stored")
+        get_fetch_stats().print_report()
+        get_web_archive().print_report()
+
+# ============================================================================
+# SHARED DEFAULT STORE
+# ============================================================================
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def get_article_store():
+    """Return the process-wide article store, opening it on first use"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ArticleStore()
+        return _default_store
+
+def set_article_store_mode(mode):
+    """Switch the shared store between use / revalidate / refresh / offline"""
+    if mode not in ARTICLE_STORE_MODES:
+        raise ValueError(f"Unknown article store mode '{mode}', expected one of {ARTICLE_STORE_MODES}")
+    get_article_store().mode = mode
+
+def scrape_article(url):
+    """(title, text) of a news article through the shared store"""
+    return get_article_store().scrape(url)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+# ============================================================================
+# ASYNC EXECUTION ENGINE
+# ============================================================================
+
+class AsyncExtractionEngine:
+    """Run blocking LLM jobs concurrently with a cap on in-flight requests per model
+
+    Each job is a dict with at least a "model" key and a zero-argument "run"
+    callable; a job that raises yields None. The blocking call runs on a
+    worker thread (so it keeps using the pooled keep-alive client) while
+    asyncio enforces the per-model limit. With a ModelAffinityScheduler only
+    its resident set of models is in flight at any time. Results come back
+    in the same order as the jobs were given. metrics, if given, is called
+    after every job and should return {model: {"in_flight": n, "limit": n}}
+    for the progress bar.
+    """
+
+    def __init__(self, per_model_concurrency=1, scheduler=None, metrics=None, progress=True):
+        self.per_model_concurrency = max(1, int(per_model_concurrency))
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.progress = progress
+        self.elapsed = 0.0
+
+    def run(self, jobs):
+        """Execute all jobs and return their results in submission order"""
+        if not jobs:
+            return []
+        return asyncio.run(self._run_all(jobs))
+
+    async def _run_all(self, jobs):
+        models = sorted({job["model"] for job in jobs})
+        semaphores = {model: asyncio.Semaphore(self.per_model_concurrency) for model in models}
+        resident = len(models)
+        if self.scheduler is not None:
+            resident = min(resident, self.scheduler.max_resident_models)
+        workers = self.per_model_concurrency * resident
+        loop = asyncio.get_running_loop()
+        bar = tqdm(total=len(jobs), desc="LLM calls", disable=not self.progress)
+
+        async def run_one(job, executor):
+            async with semaphores[job["model"]]:
+                try:
+                    return await loop.run_in_executor(executor, job["run"])
+                except Exception as e:
+                    tqdm.write(f"   ✗ {job['model']}: {str(e)[:60]}")
+                    return None
+                finally:
+                    if self.metrics is not None:
+                        bar.set_postfix_str("  ".join(
+                            f"{m} {c['in_flight']}/{c['limit']}" for m, c in self.metrics().items()
+                        ))
+                    bar.update(1)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if self.scheduler is None:
+                results = await asyncio.gather(*(run_one(job, executor) for job in jobs))
+            else:
+                results = [None] * len(jobs)
+                slots = asyncio.Semaphore(resident)
+
+                async def run_model(model, indices):
+                    # Semaphore waiters are woken FIFO, so models load in plan order
+                    async with slots:
+                        tqdm.write(f"   🔁 {model}: {len(indices)} calls")
+                        outputs = await asyncio.gather(*(run_one(jobs[i], executor) for i in indices))
+                    for i, output in zip(indices, outputs):
+                        results[i] = output
+
+                await asyncio.gather(*(run_model(model, indices)
+                                       for model, indices in self.scheduler.plan(jobs)))
+        self.elapsed = time.perf_counter() - start
+        bar.close()
+
+        return results
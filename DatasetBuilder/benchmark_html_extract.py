@@ -0,0 +1,114 @@
+import argparse
+import glob
+import os
+import sqlite3
+import time
+
+import numpy as np
+from bs4 import BeautifulSoup
+
+from article_store import ARTICLE_STORE_PATH
+from crawler import host_key
+from dataset_builder import REPUTABLE_SOURCES
+from html_extract import extract_title_and_paragraphs
+
+MAX_PARAGRAPHS = 15
+
+# The extractor this replaced
+def soup_title_and_paragraphs(html, max_paragraphs=MAX_PARAGRAPHS):
+    soup = BeautifulSoup(html, 'lxml')
+    title = soup.find('title').get_text() if soup.find('title') else ''
+    paragraphs = soup.find_all('p')
+    return title, [p.get_text() for p in paragraphs[:max_paragraphs]]
+
+EXTRACTORS = {
+    "BeautifulSoup": soup_title_and_paragraphs,
+    "pull parser": extract_title_and_paragraphs,
+}
+
+def source_of(url):
+    host = host_key(url)
+    return next((s for s in REPUTABLE_SOURCES if host == s or host.endswith("." + s)), None)
+
+def load_pages(store_path, pages_dir):
+    """(source, url, html) of saved pages: the article store's raw HTML plus any .html files"""
+    pages = []
+    if os.path.exists(store_path):
+        conn = sqlite3.connect(store_path)
+        for url, html in conn.execute("SELECT requested_url, html FROM articles WHERE html IS NOT NULL"):
+            pages.append((source_of(url) or "other", url, html))
+        conn.close()
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, "**", "*.html"), recursive=True)):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                # Files are named or foldered by source, e.g. pages/bbc.com/article1.html
+                pages.append((source_of("http://" + os.path.relpath(path, pages_dir)) or "other", path, f.read()))
+    return pages
+
+def run(extractor, html, repeats):
+    """Mean seconds per call, and the last result"""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = extractor(html, MAX_PARAGRAPHS)
+        times.append(time.perf_counter() - start)
+    return float(np.mean(times)), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark article text extraction on saved news pages")
+    parser.add_argument("--store", default=ARTICLE_STORE_PATH, help="Article store to read raw HTML from")
+    parser.add_argument("--pages", help="Directory of saved .html pages, foldered by source")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.store, args.pages)
+    if not pages:
+        print("No saved pages: run a scraper once to fill the article store, or pass --pages")
+        return
+
+    print("\n" + "="*70)
+    print("HTML EXTRACTION BENCHMARK (ms per page, ✓ = identical title and paragraphs)")
+    print("="*70)
+    print(f"{'Source':<18} {'Pages':>6} {'KB':>7} " + " ".join(f"{name:>14}" for name in EXTRACTORS)
+          + f" {'Speed-up':>9} {'Same':>6}")
+    print("-"*70)
+
+    by_source = {}
+    for source, url, html in pages:
+        by_source.setdefault(source, []).append((url, html))
+
+    totals = {name: [] for name in EXTRACTORS}
+    mismatches = []
+    for source in sorted(by_source):
+        seconds = {name: [] for name in EXTRACTORS}
+        same = 0
+        for url, html in by_source[source]:
+            results = {}
+            for name, extractor in EXTRACTORS.items():
+                mean, results[name] = run(extractor, html, args.repeats)
+                seconds[name].append(mean)
+            if results["pull parser"] == results["BeautifulSoup"]:
+                same += 1
+            else:
+                mismatches.append(url)
+        kb = np.mean([len(html) for _, html in by_source[source]]) / 1024
+        for name in EXTRACTORS:
+            totals[name].extend(seconds[name])
+        means = {name: np.mean(s) for name, s in seconds.items()}
+        print(f"{source:<18} {len(by_source[source]):>6} {kb:>7.1f} "
+              + " ".join(f"{means[name] * 1000:>14.2f}" for name in EXTRACTORS)
+              + f" {means['BeautifulSoup'] / means['pull parser']:>8.1f}x"
+              + f" {same:>3}/{len(by_source[source]):<3}{'✓' if same == len(by_source[source]) else '✗'}")
+
+    print("-"*70)
+    soup_total = sum(totals["BeautifulSoup"])
+    pull_total = sum(totals["pull parser"])
+    print(f"All {len(pages)} pages: BeautifulSoup {soup_total * 1000:.1f} ms, pull parser {pull_total * 1000:.1f} ms "
+          f"({soup_total / pull_total:.1f}x), {len(pages) - len(mismatches)}/{len(pages)} identical")
+    for url in mismatches:
+        print(f"   ✗ {url}")
+    print()
+
+if __name__ == "__main__":
+    main()
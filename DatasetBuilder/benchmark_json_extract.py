@@ -0,0 +1,115 @@
+import argparse
+import json
+import random
+import re
+import time
+
+import numpy as np
+
+from json_extract import extract_json_object
+
+# The locators this replaced
+NESTED_REGEX = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+GREEDY_REGEX = re.compile(r"\{.*\}", re.DOTALL)
+
+ANSWER = {
+    "thesis": ["Carbon pricing is the cheapest route to {net zero} emissions."],
+    "supporting_claims": ["Prices let firms find the lowest-cost cuts.", "Revenue can be returned as a dividend."],
+    "counterarguments": ["Critics say \"a tax is a tax\" and will hit rural drivers hardest."],
+    "evidence": [{"claim": "Sweden's tax", "details": {"rate": "$120/t", "since": 1991}}],
+}
+TEMPLATE = {"thesis": [], "supporting_claims": [], "counterarguments": [], "evidence": []}
+
+# Reasoning-style filler of the kind long chain-of-thought outputs contain
+PROSE = [
+    "Let me think about which sentences carry the argument.",
+    "Consider the set {s | s states a position} and its complement.",
+    "In code this would be `claims = {k: v for k, v in pairs}` or function f() { return {a: 1}; }.",
+    "The fraction \\frac{cost}{tonne} matters here, as does the author's tone.",
+    "An unfinished note {maybe revisit this",
+    "He wrote \"it's {not} that simple\" - quotes and braces are both noise.",
+    "Step {i} of {n}: check for counterarguments.",
+    "Closing thought } with a stray brace.",
+]
+
+def pathological_output(size, rng, case):
+    """Free-form model output of about size bytes with the answer buried in it"""
+    parts = []
+    while sum(len(p) + 1 for p in parts) < size:
+        parts.append(rng.choice(PROSE))
+    prose = " ".join(parts)
+    answer = json.dumps(ANSWER, ensure_ascii=False)
+    template = json.dumps(TEMPLATE)
+
+    if case == "answer_last":
+        return f"{prose}\n\nFinal answer:\n{answer}"
+    if case == "template_echo":
+        return f"The format is {template}.\n{prose}\n\n{answer}\n\nI filled in {template} as asked."
+    if case == "unclosed_brace":
+        return f"{prose} {{and so the answer is:\n{answer}\n{prose}"
+    raise ValueError(case)
+
+CASES = ["answer_last", "template_echo", "unclosed_brace"]
+
+def locate_nested_regex(text):
+    match = NESTED_REGEX.search(text)
+    return json.loads(match.group(0)) if match else None
+
+def locate_greedy_regex(text):
+    match = GREEDY_REGEX.search(text)
+    return json.loads(match.group(0)) if match else None
+
+LOCATORS = {
+    "nested regex": locate_nested_regex,
+    "greedy regex": locate_greedy_regex,
+    "scanner (best)": extract_json_object,
+}
+
+def run(locator, text, repeats):
+    """Mean seconds per call, and whether the planted answer came back"""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            result = locator(text)
+        except ValueError:
+            result = None
+        times.append(time.perf_counter() - start)
+    return float(np.mean(times)), result == ANSWER
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark JSON answer locators on long, brace-heavy outputs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 30, 40, 50], help="Output sizes in KB")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print("\n" + "="*70)
+    print("JSON LOCATOR BENCHMARK (ms per output, ✓ = planted answer recovered)")
+    print("="*70)
+    print(f"{'Case':<16} {'KB':<5} " + " ".join(f"{name:<16}" for name in LOCATORS))
+    print("-"*70)
+
+    totals = {name: [] for name in LOCATORS}
+    for case in CASES:
+        for kb in args.sizes:
+            text = pathological_output(kb * 1024, rng, case)
+            row = []
+            for name, locator in LOCATORS.items():
+                seconds, correct = run(locator, text, args.repeats)
+                totals[name].append((seconds, correct))
+                row.append(f"{seconds * 1000:>8.3f} {'✓' if correct else '✗':<7}")
+            print(f"{case:<16} {kb:<5} " + " ".join(row))
+
+    print("-"*70)
+    for name, results in totals.items():
+        recovered = sum(1 for _, correct in results if correct)
+        print(f"{name:<16} mean {np.mean([s for s, _ in results]) * 1000:.3f} ms   "
+              f"recovered {recovered}/{len(results)}")
+    print()
+
+if __name__ == "__main__":
+    main()
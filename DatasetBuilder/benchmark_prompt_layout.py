@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from article_store import scrape_article
+from comprehensive_extraction_system import PROMPT_LAYOUTS, STATIC_PROMPTS, build_prompt
+from chunking import article_token_budget, pack_text
+from llm_client import get_client
+
+# Ollama's native endpoint reports prompt_eval_count / prompt_eval_duration,
+# the OpenAI-compatible one does not
+NATIVE_CHAT_PATH = "/api/chat"
+
+MULTI_AGENT_STRATEGIES = ["chain_of_thought", "few_shot", "recursive"]
+
+def prompt_eval(model_name, prompt, temperature):
+    """Send one prompt and return (tokens evaluated, prompt-eval milliseconds)"""
+    client = get_client()
+    payload = {
+        "model": model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": False,
+        # One output token is enough - only prompt processing is being measured
+        "options": {"temperature": temperature, "num_predict": 1},
+    }
+    resp = client.session.post(client.base_url + NATIVE_CHAT_PATH, json=payload,
+                               timeout=(client.connect_timeout, client.read_timeout))
+    resp.raise_for_status()
+    data = resp.json()
+    return data.get("prompt_eval_count", 0), data.get("prompt_eval_duration", 0) / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt-eval time of the prompt layouts")
+    parser.add_argument("--model", default="llama3.1")
+    parser.add_argument("--articles", type=int, default=5, help="Gold-standard articles to use")
+    parser.add_argument("--all-strategies", action="store_true",
+                        help="Run all 7 static prompts instead of the multi-agent trio")
+    args = parser.parse_args()
+
+    strategies = list(STATIC_PROMPTS.keys()) if args.all_strategies else MULTI_AGENT_STRATEGIES
+
+    print("\n" + "="*70)
+    print("PROMPT LAYOUT BENCHMARK (prompt-eval time per call)")
+    print(f"Model: {args.model}  |  Strategies: {', '.join(strategies)}")
+    print("="*70 + "\n")
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    gold_path = os.path.join(script_dir, 'data', 'gold_standard', 'human_annotated_ground_truth_FIXED.json')
+    with open(gold_path, 'r', encoding='utf-8') as f:
+        gold_standard = json.load(f)
+
+    records = []
+    used = 0
+    for article in gold_standard:
+        if used >= args.articles:
+            break
+        scraped_title, text = scrape_article(article.get('url', ''))
+        if not text:
+            continue
+        used += 1
+        # One budget across strategies so every prompt carries the same article text
+        budget = min(article_token_budget(args.model, STATIC_PROMPTS[s]["prompt"], 1500) for s in strategies)
+        full_text = pack_text(f"{article.get('title', '')}\n{text}", budget)
+        print(f"[{used}/{args.articles}] {article['source_id']}")
+
+        for layout in PROMPT_LAYOUTS:
+            for strategy in strategies:
+                config = STATIC_PROMPTS[strategy]
+                prompt = build_prompt(config["prompt"], full_text, layout)
+                tokens, ms = prompt_eval(args.model, prompt, config["temperature"])
+                records.append({"layout": layout, "strategy": strategy, "tokens": tokens, "ms": ms})
+                print(f"   {layout:<14} {strategy:<20} {tokens:>6} tokens evaluated  {ms:>9.1f} ms")
+
+    if not records:
+        print("No articles could be scraped.")
+        return
+
+    print("\n" + "="*70)
+    print("SUMMARY")
+    print("="*70)
+    print(f"{'Layout':<16} {'Calls':<8} {'Mean tokens evaluated':<24} {'Mean prompt-eval ms':<22} {'Total ms'}")
+    print("-"*70)
+    for layout in PROMPT_LAYOUTS:
+        rows = [r for r in records if r["layout"] == layout]
+        print(f"{layout:<16} {len(rows):<8} {np.mean([r['tokens'] for r in rows]):<24.1f} "
+              f"{np.mean([r['ms'] for r in rows]):<22.1f} {np.sum([r['ms'] for r in rows]):.1f}")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# tiktoken is optional; without it token counts are estimated from word pieces
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+ARGUMENT_KEYS = ["thesis", "supporting_claims", "counterarguments", "evidence"]
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+# Context window the server runs each model with (Ollama's num_ctx)
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("LLM_CONTEXT_TOKENS", "4096"))
+MODEL_CONTEXT_TOKENS = {
+    "llama3.1": DEFAULT_CONTEXT_TOKENS,
+    "llama3.2": DEFAULT_CONTEXT_TOKENS,
+    "gemma2": DEFAULT_CONTEXT_TOKENS,
+}
+
+# Head-room for chat-template tokens and tokenizer mismatch
+SAFETY_MARGIN_TOKENS = 128
+
+MAP_REDUCE_WORKERS = int(os.environ.get("MAP_REDUCE_WORKERS", "4"))
+
+# ============================================================================
+# TOKEN COUNTING
+# ============================================================================
+
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+# Sentence ends, also after up to two closing quotes or brackets (."  .”  .)  ?’)  ...)
+_SENTENCES = re.compile(
+    r'(?<=[.!?])\s+|(?<=[.!?]["\'”’)\]])\s+|(?<=[.!?]["\'”’)\]]["\'”’)\]])\s+|\n+'
+)
+
+def count_tokens(text):
+    """Token count with tiktoken if installed, otherwise a word-piece estimate"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # BPE vocabularies split long words; roughly one token per 4 characters of a word
+    return sum((len(piece) + 3) // 4 for piece in _WORD_PIECES.findall(text))
+
+def context_tokens(model_name):
+    return MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+
+def article_token_budget(model_name, prompt_template, max_tokens):
+    """Tokens left for the article once the instructions and the answer are accounted for"""
+    instructions = count_tokens(prompt_template.replace("{text}", ""))
+    return max(256, context_tokens(model_name) - instructions - max_tokens - SAFETY_MARGIN_TOKENS)
+
+# ============================================================================
+# PACKING AND CHUNKING
+# ============================================================================
+
+def _sentences(text):
+    return [s for s in _SENTENCES.split(text) if s.strip()]
+
+def _split_word(word, token_budget):
+    """Consecutive character slices of one over-long word, each within token_budget"""
+    size = max(1, token_budget * 4)
+    while size > 1 and any(count_tokens(word[i:i + size]) + 1 > token_budget for i in range(0, len(word), size)):
+        size //= 2
+    return [word[i:i + size] for i in range(0, len(word), size)]
+
+def _split_sentence(sentence, token_budget):
+    """Consecutive pieces of an over-long sentence, each within token_budget
+
+    Split between words; a word that alone exceeds the budget is split by
+    characters.
+    """
+    pieces = []
+    current = []
+    used = 0
+    for word in sentence.split():
+        tokens = count_tokens(word) + 1
+        parts = [word] if tokens <= token_budget else _split_word(word, token_budget)
+        for part in parts:
+            tokens = count_tokens(part) + 1
+            if current and used + tokens > token_budget:
+                pieces.append(" ".join(current))
+                current = []
+                used = 0
+            current.append(part)
+            used += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def _check_coverage(text, chunks):
+    # Chunks only ever change whitespace; anything else means text was dropped
+    if "".join(text.split()) != "".join("".join(chunks).split()):
+        raise ValueError("chunk_text() lost part of the text")
+
+def chunk_text(text, token_budget):
+    """Split text into consecutive chunks of whole sentences, each within token_budget
+
+    A sentence longer than the budget is split into budget-sized pieces
+    rather than cut, so the chunks together always cover the whole text.
+    """
+    chunks = []
+    current = []
+    used = 0
+    for sentence in _sentences(text):
+        tokens = count_tokens(sentence) + 1
+        pieces = [sentence] if tokens <= token_budget else _split_sentence(sentence, token_budget)
+        for piece in pieces:
+            tokens = count_tokens(piece) + 1
+            if current and used + tokens > token_budget:
+                chunks.append(" ".join(current))
+                current = []
+                used = 0
+            current.append(piece)
+            used += tokens
+    if current:
+        chunks.append(" ".join(current))
+    _check_coverage(text, chunks)
+    return chunks
+
+def pack_text(text, token_budget):
+    """Longest prefix of text (in whole sentences) that fits token_budget"""
+    if count_tokens(text) <= token_budget:
+        return text
+    chunks = chunk_text(text, token_budget)
+    return chunks[0] if chunks else ""
+
+# ============================================================================
+# MAP-REDUCE EXTRACTION
+# ============================================================================
+
+def merge_argument_maps(arg_maps):
+    """Concatenate per-chunk argument maps in chunk order, dropping exact repeats"""
+    merged = {key: [] for key in ARGUMENT_KEYS}
+    for arg_map in arg_maps:
+        for key in ARGUMENT_KEYS:
+            for item in arg_map.get(key, []):
+                if item not in merged[key]:
+                    merged[key].append(item)
+    return merged
+
+def map_reduce_extract(text, token_budget, extract_chunk, workers=MAP_REDUCE_WORKERS):
+    """Extract each chunk in parallel with extract_chunk(chunk) and merge the results
+
+    Text that already fits the budget is passed through as a single call.
+    Returns None only if every chunk failed.
+    """
+    if count_tokens(text) <= token_budget:
+        return extract_chunk(text)
+
+    chunks = chunk_text(text, token_budget)
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        results = list(executor.map(extract_chunk, chunks))
+
+    results = [r for r in results if r]
+    if not results:
+        return None
+    return merge_argument_maps(results)
+
+def extract_within_budget(text, token_budget, extract_chunk, map_reduce=False):
+    """Pack text to the budget and extract once, or map-reduce over all of it"""
+    if map_reduce:
+        return map_reduce_extract(text, token_budget, extract_chunk)
+    return extract_chunk(pack_text(text, token_budget))
@@ -1,25 +1,8 @@
-from sentence_transformers import SentenceTransformer, util
 from tqdm import tqdm
 import json
 import numpy as np
 import os
-
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-def best_similarity(human_list, model_list):
-    if not human_list or not model_list:
-        return 0.0
-    scores = []
-    for h in human_list:
-        h_emb = model.encode(h, convert_to_tensor=True)
-        best = 0.0
-        for m in model_list:
-            m_emb = model.encode(m, convert_to_tensor=True)
-            sim = util.pytorch_cos_sim(h_emb, m_emb).item()
-            if sim > best:
-                best = sim
-        scores.append(best)
-    return np.mean(scores) if scores else 0.0
+from evaluation import best_similarity, print_embedding_report
 
 def evaluate_model(model_file, model_name, gold_standard):
     print(f"\nLoading {model_name}...")
@@ -94,6 +77,7 @@ def main():
               f"{improved:.3f} ({improved*100:.1f}%)")
     
     print("="*80 + "\n")
+    print_embedding_report()
 
 if __name__ == "__main__":
     main()
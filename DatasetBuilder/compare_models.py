@@ -1,29 +1,8 @@
-from sentence_transformers import SentenceTransformer, util
 from tqdm import tqdm
 import json
 import numpy as np
 import os
-
-# Load SBERT model for semantic similarity
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-def best_similarity(human_list, model_list):
-    """Calculate best semantic similarity between human and model extractions"""
-    if not human_list or not model_list:
-        return 0.0
-    
-    scores = []
-    for h in human_list:
-        h_emb = model.encode(h, convert_to_tensor=True)
-        best = 0.0
-        for m in model_list:
-            m_emb = model.encode(m, convert_to_tensor=True)
-            sim = util.pytorch_cos_sim(h_emb, m_emb).item()
-            if sim > best:
-                best = sim
-        scores.append(best)
-    
-    return np.mean(scores) if scores else 0.0
+from evaluation import best_similarity, print_embedding_report
 
 def evaluate_model(model_file, model_name, gold_standard):
     """Evaluate a model against gold standard"""
@@ -128,6 +107,7 @@ def main():
         json.dump(comparison_results, f, indent=2)
     
     print(f"✓ Detailed comparison saved to: {output_path}\n")
+    print_embedding_report()
 
 if __name__ == "__main__":
     main()
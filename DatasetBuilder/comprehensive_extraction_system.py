@@ -1,10 +1,19 @@
-import requests
+import argparse
 import json
-import re
 import os
-import time
-from bs4 import BeautifulSoup
-from tqdm import tqdm
+from functools import partial
+from article_store import (
+    ARTICLE_STORE_MODE, ARTICLE_STORE_MODES, get_article_store, scrape_article, set_article_store_mode
+)
+from async_engine import AsyncExtractionEngine
+from chunking import article_token_budget, extract_within_budget
+from json_extract import ARGUMENT_MAP_SCHEMA, is_answer_to, parse_argument_map, print_repair_report
+from llm_cache import CACHE_MODES, LLM_CACHE_MODE, get_cache, set_cache_mode
+from llm_client import (
+    LLM_HEDGE, LLM_POOL_SIZE, LLM_RETRIES, LLM_STREAM, LLM_STRUCTURED_OUTPUT, chat, configure_client, get_client
+)
+from scheduler import MAX_RESIDENT_MODELS, ModelAffinityScheduler
+from web_archive import WEB_ARCHIVE_MODE, WEB_ARCHIVE_MODES, set_web_archive_mode
 
 # ============================================================================
 # ALL STATIC PROMPTS (7 prompts) - UNCHANGED
@@ -205,85 +214,120 @@ STATIC_PROMPTS = {
 
 MODELS = ["llama3.1", "llama3.2", "gemma2"]
 
+# ============================================================================
+# PROMPT LAYOUT
+# ============================================================================
+
+# template      - each prompt exactly as written, article embedded in the instructions
+# article_first - shared article block first, strategy instructions after it, so the
+#                 server's prompt/KV cache can reuse the article prefix across strategies
+PROMPT_LAYOUTS = ["template", "article_first"]
+PROMPT_LAYOUT = os.environ.get("PROMPT_LAYOUT", "template")
+
+ARTICLE_FIRST_HEADER = """Article:
+{text}
+
+---
+
+"""
+
+ARTICLE_REFERENCE = "(the article is given above)"
+
+def build_prompt(prompt_template, text, layout=PROMPT_LAYOUT):
+    """Fill a STATIC_PROMPTS template with the article text using the given layout"""
+    if layout == "template":
+        return prompt_template.format(text=text)
+    if layout == "article_first":
+        instructions = prompt_template.replace("{text}", "{article}").format(article=ARTICLE_REFERENCE)
+        return ARTICLE_FIRST_HEADER.format(text=text) + instructions
+    raise ValueError(f"Unknown prompt layout '{layout}', expected one of {PROMPT_LAYOUTS}")
+
 # ============================================================================
 # FIXED EXTRACTION FUNCTION
 # ============================================================================
 
-def extract_arguments(text, prompt_template, model_name, temperature=0.2):
-    """Extract arguments using specified prompt and model - WITH FIX"""
-    prompt = prompt_template.format(text=text[:3500])
+EXTRACTION_MAX_TOKENS = 1500
+
+def extract_arguments(text, prompt_template, model_name, temperature=0.2, layout=PROMPT_LAYOUT,
+                      map_reduce=False, strategy=None):
+    """Extract arguments using specified prompt and model - WITH FIX
     
-    payload = {
-        "model": model_name,
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": temperature,
-        "max_tokens": 1500,
-    }
+    The article is packed into the model's token budget; with map_reduce=True a
+    longer article is extracted chunk by chunk in parallel and merged instead.
+    """
+    budget = article_token_budget(model_name, prompt_template, EXTRACTION_MAX_TOKENS)
+    extract_chunk = partial(_extract_chunk, prompt_template=prompt_template, model_name=model_name,
+                            temperature=temperature, layout=layout, strategy=strategy)
+    return extract_within_budget(text, budget, extract_chunk, map_reduce)
+
+def _extract_chunk(text, prompt_template, model_name, temperature, layout, strategy):
+    prompt = build_prompt(prompt_template, text, layout)
     
     try:
-        resp = requests.post("http://localhost:11434/v1/chat/completions", json=payload, timeout=90)
-        resp.raise_for_status()
-        content = resp.json()["choices"][0]["message"]["content"]
-        
-        match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-        if not match:
-            return None
-        
-        arg_map = json.loads(match.group(0))
-        
-        # FIX: Handle nested structures and convert everything to strings
-        for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-            if key not in arg_map:
-                arg_map[key] = []
-            elif not isinstance(arg_map[key], list):
-                arg_map[key] = [str(arg_map[key])]
-            
-            # NEW: Flatten nested structures and convert all items to strings
-            cleaned_items = []
-            for item in arg_map[key]:
-                if isinstance(item, dict):
-                    # If item is a dict, extract values and join them
-                    cleaned_items.append(' '.join(str(v) for v in item.values() if v))
-                elif isinstance(item, list):
-                    # If item is a list, join its elements
-                    cleaned_items.append(' '.join(str(i) for i in item if i))
-                else:
-                    # If item is already a string or other type
-                    cleaned_items.append(str(item))
-            
-            # Clean empty strings and whitespace
-            arg_map[key] = [item.strip() for item in cleaned_items if item and str(item).strip()]
+        content = chat(model_name, prompt, temperature=temperature, max_tokens=EXTRACTION_MAX_TOKENS, timeout=90,
+                       cache=True, early_stop=is_answer_to(prompt), strategy=strategy,
+                       schema=ARGUMENT_MAP_SCHEMA)
         
-        return arg_map
+        return parse_argument_map(content, get_client().uses_schema(model_name), prompt)
         
     except Exception as e:
         print(f" ✗ ({str(e)[:30]})")
         return None
 
 # ============================================================================
-# SCRAPING - UNCHANGED
+# MAIN
 # ============================================================================
 
-def scrape_article(url):
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
-        title = soup.find('title').get_text() if soup.find('title') else ''
-        paragraphs = soup.find_all('p')
-        content = " ".join([p.get_text() for p in paragraphs[:15]])
-        if len(content) < 200:
-            return None, None
-        return title, content
-    except:
-        return None, None
-
-# ============================================================================
-# MAIN - UNCHANGED
-# ============================================================================
+def add_runner_args(parser, concurrency_help="In-flight LLM requests per model (match OLLAMA_NUM_PARALLEL)"):
+    """Options shared by the static sweep and the agentic runner"""
+    parser.add_argument("--concurrency-per-model", type=int, default=1, help=concurrency_help)
+    parser.add_argument("--max-resident-models", type=int, default=MAX_RESIDENT_MODELS,
+                        help="Models the server can keep loaded at once (match OLLAMA_MAX_LOADED_MODELS)")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default=LLM_CACHE_MODE,
+                        help="Response cache: use it, refresh it (re-sample), or turn it off")
+    parser.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default=PROMPT_LAYOUT,
+                        help="article_first puts the shared article ahead of the instructions (prefix-cache friendly)")
+    parser.add_argument("--map-reduce", action="store_true",
+                        help="Extract articles longer than the model's token budget (LLM_CONTEXT_TOKENS) "
+                             "chunk by chunk and merge, instead of truncating them")
+    parser.add_argument("--stream", action="store_true", default=LLM_STREAM,
+                        help="Stream extractions and stop as soon as the argument map JSON is complete")
+    parser.add_argument("--retries", type=int, default=LLM_RETRIES,
+                        help="Retries per call on timeouts, dropped connections, 429 and 5xx (jittered backoff)")
+    parser.add_argument("--hedge", action="store_true", default=LLM_HEDGE,
+                        help="Send a duplicate request when a call runs past the model's p95 latency")
+    parser.add_argument("--structured", action="store_true", default=LLM_STRUCTURED_OUTPUT,
+                        help="Constrain extractions to the argument-map JSON schema (response_format), "
+                             "falling back to free-form output if the server rejects it")
+    parser.add_argument("--article-mode", choices=ARTICLE_STORE_MODES, default=ARTICLE_STORE_MODE,
+                        help="Article store: serve stored pages, revalidate them, re-fetch them, or stay offline")
+    parser.add_argument("--web-archive", choices=WEB_ARCHIVE_MODES, default=WEB_ARCHIVE_MODE,
+                        help="Record every page fetch to the web archive, or replay fetches from it offline")
+    return parser
+
+def apply_runner_args(args, models):
+    """Set the shared cache, article store, archive and LLM client up from add_runner_args() options"""
+    set_cache_mode(args.cache_mode)
+    set_article_store_mode(args.article_mode)
+    set_web_archive_mode(args.web_archive)
+    
+    # Size the keep-alive pool so no in-flight request has to open a fresh connection
+    # The adaptive limiter grows each model's in-flight requests up to --concurrency-per-model
+    configure_client(pool_size=max(LLM_POOL_SIZE, args.concurrency_per_model * len(models)),
+                     streaming=args.stream, max_concurrency=args.concurrency_per_model,
+                     retries=args.retries, hedge=args.hedge, structured=args.structured)
+
+def print_runner_reports():
+    get_client().print_latency_report()
+    print_repair_report()
+    get_cache().print_report()
+    get_article_store().print_report()
 
 def main():
+    parser = add_runner_args(argparse.ArgumentParser(description="Run the 21-configuration static extraction sweep"))
+    args = parser.parse_args()
+    apply_runner_args(args, MODELS)
+    
     print("\n" + "="*70)
     print("COMPREHENSIVE STATIC EXTRACTION SYSTEM")
     print("7 Prompts × 3 Models = 21 Different Configurations")
@@ -297,16 +341,17 @@ def main():
     
     print(f"✓ Loaded {len(gold_standard)} articles\n")
     
-    all_results = {model: {prompt: [] for prompt in STATIC_PROMPTS.keys()} for model in MODELS}
+    # ------------------------------------------------------------------
+    # Scrape every article once
+    # ------------------------------------------------------------------
     
+    articles = []
     for idx, article in enumerate(gold_standard):
         source_id = article['source_id']
         url = article.get('url', '')
         title = article.get('title', '')
-        topic = article.get('topic', '')
-        source = article.get('source', '')
         
-        print(f"\n[{idx+1}/{len(gold_standard)}] {source_id}")
+        print(f"[{idx+1}/{len(gold_standard)}] {source_id}")
         print(f"   Title: {title[:60]}...")
         
         if not url:
@@ -317,38 +362,50 @@ def main():
             print(f"   ❌ Scraping failed")
             continue
         
-        full_text = f"{title}\n{text}"
-        
+        articles.append({
+            "source_id": source_id,
+            "title": title,
+            "url": url,
+            "source": article.get('source', ''),
+            "topic": article.get('topic', ''),
+            "text": f"{title}\n{text}"
+        })
+    
+    # ------------------------------------------------------------------
+    # Run all article × model × prompt calls concurrently
+    # ------------------------------------------------------------------
+    
+    jobs = []
+    for article in articles:
         for model_name in MODELS:
-            print(f"   🔄 {model_name}...")
-            
             for prompt_name, config in STATIC_PROMPTS.items():
-                print(f"      - {prompt_name}...", end="", flush=True)
-                
-                arg_map = extract_arguments(
-                    full_text,
-                    config["prompt"],
-                    model_name,
-                    temperature=config["temperature"]
-                )
-                
-                if arg_map:
-                    all_results[model_name][prompt_name].append({
-                        "source_id": source_id,
-                        "title": title,
-                        "url": url,
-                        "source": source,
-                        "topic": topic,
-                        "text": full_text,
-                        "argument_map": arg_map
-                    })
-                    print(" ✓")
-                else:
-                    print(" ✗")
-                
-                time.sleep(0.5)
-        
-        print(f"   ✅ Completed")
+                jobs.append({
+                    "model": model_name,
+                    "prompt_name": prompt_name,
+                    "article": article,
+                    "run": partial(extract_arguments, article["text"], config["prompt"],
+                                   model_name, temperature=config["temperature"],
+                                   layout=args.prompt_layout, map_reduce=args.map_reduce,
+                                   strategy=prompt_name)
+                })
+    
+    scheduler = ModelAffinityScheduler(max_resident_models=args.max_resident_models)
+    print(f"\n🔄 Running {len(jobs)} extractions "
+          f"({args.concurrency_per_model} in flight per model, "
+          f"{scheduler.max_resident_models} model(s) resident)...")
+    print(f"   Model switches: {scheduler.model_switches(jobs)} in article order → "
+          f"{len(scheduler.plan(jobs))} with model affinity")
+    engine = AsyncExtractionEngine(per_model_concurrency=args.concurrency_per_model, scheduler=scheduler,
+                                   metrics=get_client().concurrency_snapshot)
+    arg_maps = engine.run(jobs)
+    print(f"   ✅ Completed in {engine.elapsed:.1f}s")
+    
+    all_results = {model: {prompt: [] for prompt in STATIC_PROMPTS.keys()} for model in MODELS}
+    for job, arg_map in zip(jobs, arg_maps):
+        if arg_map:
+            all_results[job["model"]][job["prompt_name"]].append(
+                dict(job["article"], argument_map=arg_map)
+            )
     
     print(f"\n{'='*70}")
     print("SAVING RESULTS")
@@ -367,6 +424,8 @@ def main():
             
             print(f"✓ {model_name} + {prompt_name}: {len(results)} articles")
     
+    print_runner_reports()
+    
     print(f"\n✅ ALL STATIC CONFIGURATIONS COMPLETED\n")
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_INITIAL_CONCURRENCY = int(os.environ.get("LLM_INITIAL_CONCURRENCY", "1"))
+
+# ============================================================================
+# AIMD CONCURRENCY LIMITER
+# ============================================================================
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase / multiplicative-decrease cap on in-flight LLM requests
+
+    Every fast success grows the limit by 1/limit, i.e. by one slot per
+    full window of requests. A timeout, 5xx or dropped connection, or a
+    success slower than spike_factor x the smoothed baseline latency for
+    that kind of request, multiplies the limit by backoff. Only requests
+    started after the last decrease can trigger another, so one burst of
+    slow responses halves the limit once instead of collapsing it. While
+    failures keep arriving at the minimum limit, new requests are held back
+    for an exponentially growing cooldown.
+    """
+
+    def __init__(self, initial_limit=LLM_INITIAL_CONCURRENCY, min_limit=1, max_limit=LLM_MAX_CONCURRENCY,
+                 backoff=0.5, spike_factor=2.0, smoothing=0.1, cooldown=1.0, max_cooldown=30.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.spike_factor = spike_factor
+        self.smoothing = smoothing
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.baselines = {}
+        self.cooldown_until = 0.0
+        self._cooldown = cooldown
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, blocking=True):
+        """Block until a slot is free under the current limit
+
+        With blocking=False return None at once instead of waiting.
+        """
+        with self._cond:
+            while True:
+                wait = self.cooldown_until - time.monotonic()
+                if not blocking and (wait > 0 or self.in_flight >= int(self.limit)):
+                    return None
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    self._cond.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return time.monotonic()
+
+    def release(self, started, outcome="ok", kind=None):
+        """Return a slot and adapt the limit
+
+        outcome is "ok", "overload" (timeout, 429/5xx, connection failure),
+        "error" (a failure that says nothing about server load) or
+        "cancelled" (a hedged request abandoned by the client).
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            self.in_flight -= 1
+
+            if outcome == "ok":
+                baseline = self.baselines.get(kind)
+                if baseline is not None and latency > baseline * self.spike_factor:
+                    self._decrease(started, now)
+                else:
+                    self._increase()
+                    self._cooldown = self.base_cooldown
+                self.baselines[kind] = latency if baseline is None else \
+                    (1 - self.smoothing) * baseline + self.smoothing * latency
+
+            elif outcome == "overload":
+                at_floor = self.limit <= self.min_limit
+                self._decrease(started, now)
+                if at_floor:
+                    self.cooldown_until = now + self._cooldown
+                    self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+
+            self._cond.notify_all()
+
+    def _increase(self):
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.increases += 1
+
+    def _decrease(self, started, now):
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = now
+        self.decreases += 1
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "limit": int(self.limit),
+                "peak_in_flight": self.peak_in_flight,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "cooling_down": self.cooldown_until > time.monotonic(),
+            }
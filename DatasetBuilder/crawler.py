@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from http_fetch import open_page
+from web_archive import mount_archive
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+# Requests in flight across all hosts
+CRAWL_MAX_CONNECTIONS = int(os.environ.get("CRAWL_MAX_CONNECTIONS", "16"))
+# Sustained requests per second to any one host, and how many may go back to back
+CRAWL_HOST_RATE = float(os.environ.get("CRAWL_HOST_RATE", "2"))
+CRAWL_HOST_BURST = int(os.environ.get("CRAWL_HOST_BURST", "1"))
+# Longest a host is paused for when it answers 429/503 with Retry-After
+CRAWL_MAX_RETRY_AFTER = float(os.environ.get("CRAWL_MAX_RETRY_AFTER", "60"))
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+FETCH_TIMEOUT = 10
+
+def host_key(url):
+    """Politeness key of a URL: its host without a leading www."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+# ============================================================================
+# PER-HOST TOKEN BUCKET
+# ============================================================================
+
+class TokenBucket:
+    """Blocking token bucket: rate tokens per second, at most burst saved up"""
+
+    def __init__(self, rate=CRAWL_HOST_RATE, burst=CRAWL_HOST_BURST):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.waited += waited
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Hold back every request to this host for seconds (Retry-After)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+# ============================================================================
+# POLITE CONCURRENT CRAWLER
+# ============================================================================
+
+class PoliteCrawler:
+    """Run fetches for many hosts in parallel while each host stays polite
+
+    A global cap bounds requests in flight across all hosts and a token
+    bucket per host bounds the request rate to each one, so bbc.com,
+    reuters.com and apnews.com are fetched side by side while no single
+    site sees more than CRAWL_HOST_RATE requests a second. A host that
+    answers 429/503 with Retry-After is paused for that long.
+    """
+
+    def __init__(self, max_connections=CRAWL_MAX_CONNECTIONS, host_rate=CRAWL_HOST_RATE,
+                 host_burst=CRAWL_HOST_BURST, host_rates=None):
+        self.max_connections = max(1, int(max_connections))
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.host_rates = dict(host_rates or {})
+        self.buckets = {}
+        self.counts = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.elapsed = 0.0
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._lock = threading.Lock()
+
+        self.session = mount_archive(requests.Session(), pool_size=self.max_connections)
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self.buckets:
+                rate = self.host_rates.get(host, self.host_rate)
+                self.buckets[host] = TokenBucket(rate, self.host_burst)
+                self.counts[host] = {"requests": 0, "failed": 0, "seconds": 0.0}
+            return self.buckets[host]
+
+    def call(self, host, fn):
+        """Run fn() as one request to host, under its bucket and the global cap"""
+        bucket = self.bucket(host)
+        # Wait for politeness before taking a connection slot, so a slow host
+        # never holds slots another host could use
+        bucket.acquire()
+        with self._slots:
+            with self._lock:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = fn()
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    counts = self.counts[host]
+                    counts["requests"] += 1
+                    counts["seconds"] += time.perf_counter() - start
+                    if not ok:
+                        counts["failed"] += 1
+
+    def get(self, url, read=None, **kwargs):
+        """Polite GET of url; raises for HTTP errors like requests would
+
+        With read, the body is streamed and read(page) is called with the
+        StreamedPage inside the connection slot, so the whole download
+        counts against the global cap; its result is returned.
+        """
+        host = host_key(url)
+        kwargs.setdefault("headers", HEADERS)
+        kwargs.setdefault("timeout", FETCH_TIMEOUT)
+
+        def fetch():
+            response = self.session.get(url, stream=read is not None, **kwargs)
+            if response.status_code in (429, 503):
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    self.bucket(host).pause(min(float(retry_after), CRAWL_MAX_RETRY_AFTER))
+            if read is not None:
+                return read(open_page(response))
+            response.raise_for_status()
+            return response
+
+        return self.call(host, fetch)
+
+    def map(self, tasks):
+        """Run (host, fn) tasks concurrently; results (or the exception raised) in task order
+
+        fn makes its requests through get() or call(). Tasks are interleaved
+        host by host before they are queued, so the workers spread across
+        hosts instead of queueing behind one bucket.
+        """
+        if not tasks:
+            return []
+        by_host = OrderedDict()
+        for index, (host, fn) in enumerate(tasks):
+            by_host.setdefault(host, deque()).append((index, fn))
+        order = []
+        while by_host:
+            for host in list(by_host):
+                order.append((host,) + by_host[host].popleft())
+                if not by_host[host]:
+                    del by_host[host]
+
+        results = [None] * len(tasks)
+
+        def run(entry):
+            host, index, fn = entry
+            try:
+                results[index] = fn()
+            except Exception as e:
+                results[index] = e
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_connections, len(tasks))) as executor:
+            list(executor.map(run, order))
+        self.elapsed += time.perf_counter() - start
+        return results
+
+    def print_report(self):
+        with self._lock:
+            counts = {host: dict(c) for host, c in self.counts.items()}
+            waited = {host: bucket.waited for host, bucket in self.buckets.items()}
+        total = sum(c["requests"] for c in counts.values())
+        print(f"\nCrawler: {total} requests to {len(counts)} hosts in {self.elapsed:.1f}s "
+              f"(peak {self.peak_in_flight}/{self.max_connections} connections)")
+        print(f"{'Host':<28} {'Requests':>9} {'Failed':>7} {'Mean s':>7} {'Waited s':>9}")
+        for host in sorted(counts, key=lambda h: -counts[h]["requests"]):
+            c = counts[host]
+            mean = c["seconds"] / c["requests"] if c["requests"] else 0.0
+            print(f"{host:<28} {c['requests']:>9} {c['failed']:>7} {mean:>7.2f} {waited[host]:>9.1f}")
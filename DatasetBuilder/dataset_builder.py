@@ -1,11 +1,15 @@
-import requests
 import json
+import os
 import time
-import re
-from bs4 import BeautifulSoup
 from ddgs.ddgs import DDGS
-
-LLM_API_URL = "http://localhost:11434/v1/chat/completions"
+from crawler import PoliteCrawler, host_key
+from html_extract import extract_title_and_paragraphs
+from http_fetch import get_fetch_stats
+from search_cache import get_search_cache
+from web_archive import get_web_archive
+from chunking import article_token_budget, pack_text
+from json_extract import ARGUMENT_MAP_SCHEMA, parse_argument_map
+from llm_client import chat, get_client
 
 # Single list of reputable sources
 REPUTABLE_SOURCES = [
@@ -29,84 +33,100 @@ TOPICS = [
     "renewable energy"
 ]
 
-def fetch_articles(topic, source, max_articles=2):
-    """Fetch articles from specific source"""
-    articles = []
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
-    try:
-        query = f"{topic} site:{source}"
-        
+SEARCH_HOST = "duckduckgo.com"
+# DDGS is rate limited far harder than the news sites
+SEARCH_RATE = float(os.environ.get("CRAWL_SEARCH_RATE", "1"))
+
+def make_crawler():
+    return PoliteCrawler(host_rates={SEARCH_HOST: SEARCH_RATE})
+
+def search_articles(topic, source, max_articles=2, crawler=None):
+    """DDGS news results for topic on source, from the search cache when it has them"""
+    crawler = crawler or make_crawler()
+    query = f"{topic} site:{source}"
+
+    def search():
         with DDGS() as ddgs:
-            results = list(ddgs.news(query=query, max_results=max_articles))
-        
+            return list(ddgs.news(query=query, max_results=max_articles))
+
+    # A cached result list costs no search-rate token
+    return get_search_cache().search(topic, source, max_articles, lambda: crawler.call(SEARCH_HOST, search))
+
+def fetch_article(result, topic, source, crawler):
+    """Download one search result; the article dict, or None if it is too short"""
+    url = result.get('url', '')
+
+    # Stop downloading once the first 15 paragraphs are in
+    def read(page):
+        return extract_title_and_paragraphs(page.chunks(), max_paragraphs=15, title=False)[1]
+
+    paragraphs = crawler.get(url, read=read)
+    content = " ".join(paragraphs)
+
+    if len(content) > 300:
+        return {
+            "title": result.get('title', ''),
+            "url": url,
+            "content": content,
+            "source": source,
+            "topic": topic
+        }
+    return None
+
+def fetch_articles(topic, source, max_articles=2, crawler=None):
+    """Fetch articles from specific source"""
+    return crawl([(topic, source)], max_articles, crawler)[(topic, source)]
+
+def crawl(pairs, max_articles=2, crawler=None):
+    """Search and fetch every (topic, source) pair concurrently
+
+    All searches run first, then every result URL is fetched at once; the
+    crawler keeps each host to its own rate while different hosts proceed
+    in parallel. Returns {(topic, source): [article, ...]} with articles in
+    search-result order.
+    """
+    crawler = crawler or make_crawler()
+
+    searches = crawler.map([
+        (SEARCH_HOST, lambda t=topic, s=source: search_articles(t, s, max_articles, crawler))
+        for topic, source in pairs
+    ])
+
+    jobs = []
+    for (topic, source), results in zip(pairs, searches):
+        if isinstance(results, Exception):
+            print(f"  Search error ({topic} / {source}): {results}")
+            continue
         for result in results:
-            url = result.get('url', '')
-            title = result.get('title', '')
-            
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'lxml')
-                paragraphs = soup.find_all('p')
-                content = " ".join([p.get_text() for p in paragraphs[:15]])
-                
-                if len(content) > 300:
-                    articles.append({
-                        "title": title,
-                        "url": url,
-                        "content": content,
-                        "source": source,
-                        "topic": topic
-                    })
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"    Skip {url}: {e}")
-                continue
-    
-    except Exception as e:
-        print(f"  Search error: {e}")
-    
+            jobs.append((topic, source, result))
+
+    fetched = crawler.map([
+        (host_key(result.get('url', '')), lambda r=result, t=topic, s=source: fetch_article(r, t, s, crawler))
+        for topic, source, result in jobs
+    ])
+
+    articles = {pair: [] for pair in pairs}
+    for (topic, source, result), article in zip(jobs, fetched):
+        if isinstance(article, Exception):
+            print(f"    Skip {result.get('url', '')}: {article}")
+        elif article is not None:
+            articles[(topic, source)].append(article)
     return articles
 
 def extract_argument_map(text):
     """Extract arguments using LLM"""
-    prompt = (
+    instructions = (
         "Extract thesis, supporting claims, counterclaims, and evidence from this article. "
         "Return ONLY a valid JSON with keys: thesis, supporting_claims, counterarguments, evidence (all lists).\n\n"
-        "Article:\n" + text[:1500]
+        "Article:\n"
     )
-    
-    payload = {
-        "model": "llama3.1",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.2,
-        "max_tokens": 1024,
-    }
+    prompt = instructions + pack_text(text, article_token_budget("llama3.1", instructions, 1024))
     
     try:
-        resp = requests.post(LLM_API_URL, json=payload, timeout=60)
-        resp.raise_for_status()
-        content = resp.json()["choices"][0]["message"]["content"]
+        content = chat("llama3.1", prompt, temperature=0.2, max_tokens=1024, timeout=60,
+                       strategy="dataset_builder", schema=ARGUMENT_MAP_SCHEMA)
         
-        match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-        if not match:
-            return None
-        
-        arg_map = json.loads(match.group(0))
-        
-        for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-            if key not in arg_map:
-                arg_map[key] = []
-            elif not isinstance(arg_map[key], list):
-                arg_map[key] = [str(arg_map[key])]
-        
-        return arg_map
+        return parse_argument_map(content, get_client().uses_schema("llama3.1"), prompt)
         
     except Exception as e:
         return None
@@ -114,13 +134,20 @@ def extract_argument_map(text):
 def main():
     print("Building single dataset from reputable sources...\n")
     dataset = []
+
+    crawler = make_crawler()
+    crawled = crawl([(topic, source) for topic in TOPICS for source in REPUTABLE_SOURCES],
+                    max_articles=2, crawler=crawler)
+    get_search_cache().print_report()
+    crawler.print_report()
+    get_fetch_stats().print_report()
+    get_web_archive().print_report()
     
     for topic in TOPICS:
         print(f"\nTopic: {topic}")
         for source in REPUTABLE_SOURCES:
-            print(f"  Source: {source}...", end="")
-            articles = fetch_articles(topic, source, max_articles=2)
-            print(f" {len(articles)} articles")
+            articles = crawled[(topic, source)]
+            print(f"  Source: {source}... {len(articles)} articles")
             
             for article in articles:
                 text = f"{article['title']}\n{article['content']}"
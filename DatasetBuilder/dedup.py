@@ -0,0 +1,156 @@
+import os
+import re
+import zlib
+
+ARGUMENT_KEYS = ["thesis", "supporting_claims", "counterarguments", "evidence"]
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+# Shingle-set Jaccard similarity at which two items count as the same point;
+# 1.0 or more merges only items whose normalized full text is identical
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.7"))
+
+# MinHash signature: BANDS x ROWS hash functions, bucketed band by band (LSH)
+BANDS = 16
+ROWS = 2
+
+# Most earlier items an item is compared with, so even a run of near-identical items stays linear
+MAX_CANDIDATES = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seeds so merges are reproducible across runs and processes
+_PERMUTATIONS = [((i * 0x9E3779B97F4A7C15 + 0x632BE59BD9B4E019) % _MERSENNE_PRIME | 1,
+                  (i * 0xBF58476D1CE4E5B9 + 0x94D049BB133111EB) % _MERSENNE_PRIME)
+                 for i in range(1, BANDS * ROWS + 1)]
+
+_WORDS = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+# ============================================================================
+# SIMILARITY
+# ============================================================================
+
+def _stem(token):
+    # Plural "s" only: enough for "dividend" / "dividends" without a stemmer dependency
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+def token_set(text):
+    """Lower-cased content words of text, ignoring punctuation, stopwords and plural s"""
+    words = _WORDS.findall(str(text).lower())
+    tokens = {_stem(t) for t in words if t not in STOPWORDS}
+    return frozenset(tokens) if tokens else frozenset(words)
+
+def shingles(text):
+    """Content words of text plus each pair of adjacent content words
+
+    The word pairs keep order in play, so "Russia attacked Ukraine" and
+    "Ukraine attacked Russia" share their words but not their bigrams.
+    """
+    words = [_stem(t) for t in _WORDS.findall(str(text).lower()) if t not in STOPWORDS]
+    if not words:
+        return token_set(text)
+    return frozenset(words) | frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of an item, for exact matching"""
+    return " ".join(str(text).split()).lower()
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def minhash(tokens):
+    """MinHash signature of a token set (one value per permutation)"""
+    hashes = [zlib.crc32(t.encode("utf-8")) for t in tokens] or [0]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+# ============================================================================
+# ORDER-PRESERVING MERGE
+# ============================================================================
+
+def merge_exact_duplicates(items):
+    """merge_near_duplicates() for identical items only (same text up to case and whitespace)"""
+    kept = []
+    index_of = {}
+    for text, source in items:
+        key = normalize_text(text)
+        if key in index_of:
+            sources = kept[index_of[key]][1]
+            if source not in sources:
+                sources.append(source)
+            continue
+        index_of[key] = len(kept)
+        kept.append((text, [source]))
+    return kept
+
+def merge_near_duplicates(items, threshold=DEDUP_THRESHOLD):
+    """Collapse near-duplicate strings, keeping the first occurrence of each
+
+    items is a sequence of (text, source) pairs in priority order. Returns a
+    list of (text, [sources]) in first-seen order, where sources lists every
+    source that produced the item or a near-duplicate of it.
+
+    Candidate pairs come from MinHash LSH buckets, so each item is compared
+    only with (at most MAX_CANDIDATES of) the earlier items it shares a band
+    with, which keeps the merge linear; a candidate is merged if its exact
+    shingle-set Jaccard similarity reaches threshold. At threshold 1.0 or
+    more only identical items are merged (merge_exact_duplicates).
+    """
+    if threshold >= 1.0:
+        return merge_exact_duplicates(items)
+
+    kept = []
+    token_sets = []
+    buckets = {}
+
+    for text, source in items:
+        tokens = shingles(text)
+        signature = minhash(tokens)
+        keys = [(band, tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+        match = None
+        seen = set()
+        for key in keys:
+            for index in buckets.get(key, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                if jaccard(tokens, token_sets[index]) >= threshold:
+                    match = index
+                if match is not None or len(seen) >= MAX_CANDIDATES:
+                    break
+            if match is not None or len(seen) >= MAX_CANDIDATES:
+                break
+
+        if match is not None:
+            if source not in kept[match][1]:
+                kept[match][1].append(source)
+            continue
+
+        index = len(kept)
+        kept.append((text, [source]))
+        token_sets.append(tokens)
+        for key in keys:
+            buckets.setdefault(key, []).append(index)
+
+    return kept
+
+def merge_argument_maps(results, threshold=DEDUP_THRESHOLD):
+    """Merge {source: argument_map} category by category
+
+    Returns (argument_map, provenance), where provenance[key][i] lists the
+    sources behind argument_map[key][i].
+    """
+    merged = {}
+    provenance = {}
+    for key in ARGUMENT_KEYS:
+        items = [(item, source) for source, arg_map in results.items() for item in arg_map.get(key, [])]
+        pairs = merge_near_duplicates(items, threshold)
+        merged[key] = [text for text, _ in pairs]
+        provenance[key] = [sources for _, sources in pairs]
+    return merged, provenance
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+EMBEDDING_STORE_DIR = os.environ.get(
+    "EMBEDDING_STORE_DIR", os.path.join(_script_dir, 'data', 'cache', 'embeddings')
+)
+# float32 keeps scores exactly as computed; float16 halves the file at ~1e-3 precision
+EMBEDDING_STORE_DTYPE = os.environ.get("EMBEDDING_STORE_DTYPE", "float32")
+
+# use - read stored vectors and store new ones
+# off - always encode
+EMBEDDING_STORE_MODE = os.environ.get("EMBEDDING_STORE_MODE", "use")
+EMBEDDING_STORE_MODES = ["use", "off"]
+
+_SPACES = re.compile(r"\s+")
+
+def text_key(text):
+    """20-byte key of a string, ignoring runs of whitespace the tokenizer ignores too"""
+    normalized = _SPACES.sub(" ", str(text)).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).digest()
+
+# ============================================================================
+# MEMORY-MAPPED EMBEDDING STORE
+# ============================================================================
+
+class EmbeddingStore:
+    """Embeddings of one encoder in a memory-mapped matrix, indexed by text hash
+
+    Vectors are rows of a flat float32 (or float16) file that is read
+    through np.memmap, so lookups touch only the pages they need and every
+    process shares the OS page cache. A SQLite index maps each text key to
+    its row. New rows are written to the file before their keys are
+    committed, and SQLite serializes writers, so several evaluation
+    processes can fill and read the same store at once.
+    """
+
+    def __init__(self, encoder_name, directory=EMBEDDING_STORE_DIR, dtype=EMBEDDING_STORE_DTYPE):
+        self.encoder_name = encoder_name
+        self.directory = os.path.join(directory, re.sub(r"[^\w.-]+", "_", encoder_name).strip("_"))
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self.dim = None
+        self._map = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, f"vectors.{self.dtype.name}")
+        self.conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=60,
+                                    check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS rows (key BLOB PRIMARY KEY, row INTEGER) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        if row is not None:
+            self.dim = row[0]
+
+    def _rows(self, keys):
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # SQLite caps the number of bound parameters per statement
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self.conn.execute(f"SELECT key, row FROM rows WHERE key IN ({placeholders})", batch))
+        return found
+
+    def _read(self, rows):
+        needed = max(rows) + 1
+        if self._map is None or self._map.shape[0] < needed:
+            count = os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+            self._map = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(count, self.dim))
+        return np.asarray(self._map[rows], dtype=np.float32)
+
+    def _append(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        # BEGIN IMMEDIATE takes the write lock, so concurrent writers get disjoint rows
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.dim is None:
+                stored = self.conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+                self.dim = stored[0] if stored else vectors.shape[1]
+                self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (self.dim,))
+            # Another process may have stored some of these since we looked
+            existing = self._rows(keys)
+            fresh = [(i, key) for i, key in enumerate(keys) if key not in existing]
+            stored = self.conn.execute("SELECT value FROM meta WHERE name = 'rows'").fetchone()
+            next_row = stored[0] if stored else 0
+            if fresh:
+                block = vectors[[i for i, _ in fresh]]
+                with open(self.vectors_path, "ab") as f:
+                    f.truncate(next_row * self.dim * self.dtype.itemsize)
+                    f.seek(next_row * self.dim * self.dtype.itemsize)
+                    f.write(block.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.conn.executemany("INSERT INTO rows VALUES (?, ?)",
+                                      [(key, next_row + n) for n, (_, key) in enumerate(fresh)])
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('rows', ?)", (next_row + len(fresh),))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def encode(self, texts, encode_fn):
+        """float32 matrix of embeddings for texts, calling encode_fn only for unseen strings
+
+        encode_fn takes a list of strings and returns a 2-D array-like.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        keys = [text_key(t) for t in texts]
+        with self._lock:
+            found = self._rows(keys)
+            unseen = [k for k in keys if k not in found]
+            self.hits += len(keys) - len(unseen)
+            self.misses += len(unseen)
+
+            if unseen:
+                first = {}
+                for key, text in zip(keys, texts):
+                    first.setdefault(key, text)
+                missing = list(dict.fromkeys(unseen))
+                vectors = np.asarray(encode_fn([first[k] for k in missing]), dtype=np.float32)
+                self._append(missing, vectors)
+                found = self._rows(keys)
+            elif self.dim is None:
+                # Filled by another process since this one opened the store
+                self.dim = self.conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()[0]
+
+            return self._read([found[k] for k in keys])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self.conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+            return {
+                "encoder": self.encoder_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "size_mb": os.path.getsize(self.vectors_path) / (1024 * 1024)
+                if os.path.exists(self.vectors_path) else 0.0,
+            }
+
+    def print_report(self):
+        s = self.stats()
+        print(f"\nEmbedding store ({s['encoder']}): {s['hits']} hits, {s['misses']} encoded "
+              f"({s['hit_rate']*100:.1f}% hit rate), {s['entries']} vectors / {s['size_mb']:.1f} MB")
+
+# ============================================================================
+# SHARED STORES
+# ============================================================================
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_embedding_store(encoder_name):
+    """Return the process-wide store for encoder_name, opening it on first use"""
+    with _stores_lock:
+        if encoder_name not in _stores:
+            _stores[encoder_name] = EmbeddingStore(encoder_name)
+        return _stores[encoder_name]
+
+def print_embedding_report():
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.print_report()
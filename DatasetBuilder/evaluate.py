@@ -0,0 +1,59 @@
+import time
+
+_start = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+
+# ============================================================================
+# SUBCOMMANDS
+# ============================================================================
+
+# name -> (module, entry point, help). Modules are imported only when their
+# subcommand runs, and torch / the sentence encoder only when a subcommand
+# first encodes something, so count and baseline-count never load them.
+SUBCOMMANDS = {
+    "count": ("simple_comparison", "main",
+              "Check how many articles each static and agentic system extracted"),
+    "semantic": ("semantic_similarity_evaluation", "main",
+                 "Semantic similarity of the baseline dataset to the gold standard"),
+    "baseline-count": ("evaluate_baseline", "evaluate_baseline",
+                       "Element-count accuracy of the baseline dataset"),
+    "compare": ("ultimate_comparison", "main",
+                "Semantic comparison of all static and agentic systems"),
+}
+
+# ============================================================================
+# COLD-START TIMING
+# ============================================================================
+
+def print_cold_start(command, startup, imported, finished):
+    """Where a subcommand's wall time went: startup, its imports, the encoder, the work"""
+    from evaluation import encoder_load_seconds
+
+    encoder = encoder_load_seconds()
+    work = finished - imported - (encoder or 0.0)
+    print(f"\nCold start ({command}): startup {startup:.2f}s, imports {imported - startup:.2f}s, "
+          f"encoder {f'{encoder:.2f}s' if encoder is not None else 'not loaded'} "
+          f"(torch {'imported' if 'torch' in sys.modules else 'not imported'}); "
+          f"work {work:.2f}s, total {finished:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate extracted argument maps")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (_, _, help_text) in SUBCOMMANDS.items():
+        commands.add_parser(name, help=help_text)
+    args = parser.parse_args()
+
+    module_name, entry_point, _ = SUBCOMMANDS[args.command]
+    startup = time.perf_counter() - _start
+    run = getattr(importlib.import_module(module_name), entry_point)
+    imported = time.perf_counter() - _start
+    try:
+        run()
+    finally:
+        print_cold_start(args.command, startup, imported, time.perf_counter() - _start)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 # save as evaluate_baseline.py
-# Run from: C:\Users\Mr. Mohit Makde\OneDrive\Desktop\Argument-Cartographer-main
 
 import json
+import os
 
 
 def calculate_f1_score(predicted, ground_truth):
@@ -32,12 +32,14 @@ def calculate_f1_score(predicted, ground_truth):
 
 
 def evaluate_baseline():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
     # Load gold standard - WITH DatasetBuilder prefix
-    with open('DatasetBuilder/data/gold_standard/human_annotated_ground_truth.json', 'r', encoding='utf-8') as f:
+    with open(os.path.join(script_dir, 'data', 'gold_standard', 'human_annotated_ground_truth.json'), 'r', encoding='utf-8') as f:
         gold_standard = json.load(f)
     
     # Load baseline dataset - WITH DatasetBuilder prefix
-    with open('DatasetBuilder/data/processed/reputable_news_dataset_cleaned.json', 'r', encoding='utf-8') as f:
+    with open(os.path.join(script_dir, 'data', 'processed', 'reputable_news_dataset_cleaned.json'), 'r', encoding='utf-8') as f:
         baseline_data = json.load(f)
     
     # Match by source_id
@@ -114,7 +116,7 @@ def evaluate_baseline():
     print(f"{'='*70}\n")
     
     # Save results - WITH DatasetBuilder prefix
-    with open('DatasetBuilder/data/processed/baseline_evaluation_results.json', 'w', encoding='utf-8') as f:
+    with open(os.path.join(script_dir, 'data', 'processed', 'baseline_evaluation_results.json'), 'w', encoding='utf-8') as f:
         json.dump({
             "average_accuracy": avg_overall,
             "category_scores": {
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    from .embedding_store import EMBEDDING_STORE_MODE, get_embedding_store, print_embedding_report
+except ImportError:  # run as a script from DatasetBuilder/
+    from embedding_store import EMBEDDING_STORE_MODE, get_embedding_store, print_embedding_report
+
+ARGUMENT_KEYS = ["thesis", "supporting_claims", "counterarguments", "evidence"]
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+EVAL_ENCODER = os.environ.get("EVAL_ENCODER", "all-MiniLM-L6-v2")
+EVAL_BATCH_SIZE = int(os.environ.get("EVAL_BATCH_SIZE", "64"))
+
+# Largest difference from scoring each pair on its own (float64) that the batched
+# float32 matrix may show; vectors stored as float16 move scores by up to ~1e-3
+SCORE_TOLERANCE = 1e-6
+FLOAT16_SCORE_TOLERANCE = 2e-3
+
+# ============================================================================
+# SHARED ENCODER
+# ============================================================================
+
+_encoder = None
+_encoder_seconds = None
+_encoder_lock = threading.Lock()
+
+def get_encoder():
+    """Return the sentence encoder, loading it (and torch) on first use"""
+    global _encoder, _encoder_seconds
+    with _encoder_lock:
+        if _encoder is None:
+            start = time.perf_counter()
+            from sentence_transformers import SentenceTransformer
+            _encoder = SentenceTransformer(EVAL_ENCODER)
+            _encoder_seconds = time.perf_counter() - start
+        return _encoder
+
+def encoder_load_seconds():
+    """Seconds spent importing torch and loading the encoder, or None if it was never needed"""
+    return _encoder_seconds
+
+def encode(texts, model=None):
+    """Embeddings of texts, one row per string, from a single batched call
+
+    With the shared encoder, strings already in the embedding store are
+    read from it and only unseen ones are encoded (and stored).
+    """
+    texts = list(texts)
+    if model is None and EMBEDDING_STORE_MODE == "use":
+        store = get_embedding_store(EVAL_ENCODER)
+        return store.encode(texts, lambda batch: get_encoder().encode(
+            batch, batch_size=EVAL_BATCH_SIZE, convert_to_numpy=True, show_progress_bar=False))
+    model = model or get_encoder()
+    vectors = model.encode(texts, batch_size=EVAL_BATCH_SIZE, convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+def normalize_rows(vectors):
+    """Unit-length rows, with the same 1e-12 floor on the norm as sentence_transformers"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def cos_sim(a, b):
+    """Cosine similarity matrix of two sets of row vectors, in numpy (no torch import)"""
+    return normalize_rows(a) @ normalize_rows(b).T
+
+def best_scores(similarities):
+    """Per human item, its best similarity to any model item, floored at 0"""
+    # Row maxima over plain floats, starting from 0.0 like the pairwise loop this replaced
+    return [max([0.0] + row) for row in similarities.tolist()]
+
+def best_similarity(human_list, model_list, model=None):
+    """Mean over human items of the best cosine similarity to any model item
+
+    Each list is encoded once, and the scores come from one human x model
+    similarity matrix instead of one encoder pass per pair. The batched
+    float32 product is not bit-identical to pair-by-pair scoring; scores
+    agree within SCORE_TOLERANCE (FLOAT16_SCORE_TOLERANCE when the
+    embedding store keeps float16 vectors).
+    """
+    if not human_list or not model_list:
+        return 0.0
+
+    similarities = cos_sim(encode(human_list, model), encode(model_list, model))
+    scores = best_scores(similarities)
+    return np.mean(scores) if scores else 0.0
+
+# ============================================================================
+# CORPUS-WIDE EMBEDDING TABLE
+# ============================================================================
+
+class EmbeddingTable:
+    """Embeddings of every string an evaluation will need, encoded in one pass
+
+    Built from all gold and system strings up front: each distinct string
+    is encoded once in large batches, however many systems produced it,
+    and scoring then only indexes rows of the shared matrix.
+    """
+
+    def __init__(self, texts, model=None):
+        texts = list(texts)
+        self.rows = {}
+        for text in texts:
+            self.rows.setdefault(text, len(self.rows))
+        self.total = len(texts)
+        start = time.perf_counter()
+        self.vectors = normalize_rows(encode(list(self.rows), model))
+        self.seconds = time.perf_counter() - start
+
+    def __getitem__(self, texts):
+        return self.vectors[[self.rows[text] for text in texts]]
+
+    def best_similarity(self, human_list, model_list):
+        """best_similarity() computed from the table's rows"""
+        if not human_list or not model_list:
+            return 0.0
+
+        # Rows are already unit length
+        similarities = self[human_list] @ self[model_list].T
+        scores = best_scores(similarities)
+        return np.mean(scores) if scores else 0.0
+
+    def print_report(self):
+        unique = len(self.rows)
+        rate = unique / self.seconds if self.seconds else float("inf")
+        print(f"Embedded {unique} unique strings ({self.total} occurrences, "
+              f"{(1 - unique / self.total) * 100 if self.total else 0:.1f}% duplicates) "
+              f"in {self.seconds:.1f}s - {rate:,.0f} strings/sec")
+
+def argument_strings(argument_map):
+    """Every string of an argument map, category by category"""
+    return [item for key in ARGUMENT_KEYS for item in (argument_map or {}).get(key, [])]
@@ -0,0 +1,143 @@
+from lxml import etree
+
+# ============================================================================
+# EARLY-TERMINATING PARAGRAPH EXTRACTION
+# ============================================================================
+
+# BeautifulSoup keeps the strings inside these tags out of get_text()
+HIDDEN_TAGS = frozenset(["script", "style", "template", "rt", "rp"])
+
+# Characters fed to the parser at a time; the same chunking BeautifulSoup's
+# lxml builder uses, so both see identical parser events
+CHUNK_SIZE = 512
+
+# ...and collapses whitespace-only strings outside these to "\n" or " "
+PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+_ASCII_SPACES = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+
+def _string(text, preserve):
+    if preserve or text.translate(_ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+def _visible_text(element, parts, preserve):
+    if element.tag in HIDDEN_TAGS or not isinstance(element.tag, str):
+        return
+    preserve = preserve or element.tag in PRESERVE_WHITESPACE_TAGS
+    if element.text:
+        parts.append(_string(element.text, preserve))
+    for child in element:
+        _visible_text(child, parts, preserve)
+        if child.tail:
+            parts.append(_string(child.tail, preserve))
+
+def element_text(element):
+    """Text of element as BeautifulSoup's get_text() would give it"""
+    preserve = False
+    for ancestor in element.iterancestors():
+        if ancestor.tag in HIDDEN_TAGS:
+            return ""
+        preserve = preserve or ancestor.tag in PRESERVE_WHITESPACE_TAGS
+    parts = []
+    _visible_text(element, parts, preserve)
+    return "".join(parts)
+
+def _pieces(source):
+    """source (a str, bytes, or iterable of str as it is downloaded) in CHUNK_SIZE pieces"""
+    if isinstance(source, (str, bytes)):
+        for offset in range(0, len(source), CHUNK_SIZE):
+            yield source[offset:offset + CHUNK_SIZE]
+        return
+    rest = ""
+    try:
+        for text in source:
+            text = rest + text
+            end = len(text) - len(text) % CHUNK_SIZE
+            for offset in range(0, end, CHUNK_SIZE):
+                yield text[offset:offset + CHUNK_SIZE]
+            rest = text[end:]
+        if rest:
+            yield rest
+    finally:
+        # Stop the download as soon as the parser is done with it
+        if hasattr(source, "close"):
+            source.close()
+
+def _parser(encoding=None):
+    return etree.HTMLPullParser(events=("start", "end"), recover=True, strip_cdata=False, encoding=encoding)
+
+def _events(source):
+    """(event, element) pairs of source, parsed incrementally piece by piece"""
+    parser = _parser()
+    encode = False
+    pieces = _pieces(source)
+    try:
+        for piece in pieces:
+            if encode:
+                piece = piece.encode("utf-8")
+            try:
+                parser.feed(piece)
+            except ValueError:
+                if encode or not isinstance(piece, str):
+                    raise
+                # lxml refuses str input with an XML encoding declaration
+                encode = True
+                parser = _parser(encoding="utf-8")
+                parser.feed(piece.encode("utf-8"))
+            yield from parser.read_events()
+    finally:
+        pieces.close()
+    try:
+        parser.close()
+    except etree.LxmlError:
+        pass
+    yield from parser.read_events()
+
+def extract_title_and_paragraphs(html, max_paragraphs=15, title=True):
+    """(title, [paragraph text]) of a page, stopping as soon as both are known
+
+    Gives the same strings as soup.find('title').get_text() (or '' without
+    a title) and [p.get_text() for p in soup.find_all('p')[:max_paragraphs]]
+    with BeautifulSoup's lxml parser, but from a pull parser that stops
+    reading once the first max_paragraphs <p> elements have closed and the
+    title has been seen, so the rest of the page - usually most of it - is
+    never parsed. html may also be an iterable of text chunks (a
+    StreamedPage's chunks()), which then stops downloading at the same
+    point. max_paragraphs=None keeps every paragraph; title=False skips the
+    title (and the search for it on pages that have none).
+    """
+    title_text = "" if title else None
+    title_element = None
+    title_done = not title
+    paragraphs = []
+    pending = {}
+
+    events = _events(html)
+    for event, element in events:
+        tag = element.tag
+        if event == "start":
+            if tag == "p" and (max_paragraphs is None or len(paragraphs) < max_paragraphs):
+                pending[element] = len(paragraphs)
+                paragraphs.append(element)
+            elif tag == "title" and title_element is None and title:
+                title_element = element
+            continue
+
+        if element in pending:
+            paragraphs[pending.pop(element)] = element_text(element)
+        elif element is title_element:
+            title_text = element_text(element)
+            title_done = True
+        elif tag in HIDDEN_TAGS and not pending:
+            # Nothing still being collected can need this subtree's text
+            element.clear(keep_tail=True)
+
+        if title_done and not pending and max_paragraphs is not None and len(paragraphs) >= max_paragraphs:
+            break
+    events.close()
+
+    # Elements the parser never closed (input cut short) are read as they stand
+    paragraphs = [p if isinstance(p, str) else element_text(p) for p in paragraphs]
+    if title_element is not None and not title_done:
+        title_text = element_text(title_element)
+    return title_text, paragraphs
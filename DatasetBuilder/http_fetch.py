@@ -0,0 +1,174 @@
+import codecs
+import os
+import re
+import threading
+import time
+
+import requests
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+# Most body bytes read from one page; the rest of a bigger page is never downloaded
+FETCH_MAX_BYTES = int(os.environ.get("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+# Wall-clock limit on reading one body (the request timeout only bounds each read)
+FETCH_BODY_TIMEOUT = float(os.environ.get("FETCH_BODY_TIMEOUT", "20"))
+FETCH_CHUNK_BYTES = 16 * 1024
+
+# Content types worth parsing; a response without one is given the benefit of the doubt
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+class ContentRejected(requests.RequestException):
+    """The response is not an HTML page"""
+
+# ============================================================================
+# STREAMED PAGE
+# ============================================================================
+
+def _lookup(encoding):
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return None
+
+class StreamedPage:
+    """Body of a streamed response, decoded as it arrives and capped at max_bytes
+
+    Raises ContentRejected at once for a non-HTML Content-Type, before any
+    of the body is read. The charset comes from the Content-Type header,
+    else from a <meta> tag in the first chunk, else UTF-8. Iterating
+    chunks() reads and decodes the body piece by piece; a consumer that
+    stops early (the paragraph extractor, once it has enough) leaves the
+    rest undownloaded. bytes_fetched counts bytes read off the wire,
+    bytes_used the body bytes handed to the consumer.
+    """
+
+    def __init__(self, response, max_bytes=FETCH_MAX_BYTES, body_timeout=FETCH_BODY_TIMEOUT, stats=None):
+        self.response = response
+        self.url = response.url
+        self.max_bytes = max_bytes
+        self.body_timeout = body_timeout
+        self.stats = stats
+        self.bytes_fetched = 0
+        self.bytes_used = 0
+        self.truncated = False
+        self.complete = False
+
+        content_type = response.headers.get("Content-Type", "")
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type and media_type not in HTML_CONTENT_TYPES:
+            response.close()
+            if stats is not None:
+                stats.record(self, rejected=True)
+            raise ContentRejected(f"Not an HTML page ({media_type}): {self.url}", response=response)
+
+        declared = _CHARSET.search(content_type)
+        self.encoding = _lookup(declared.group(1)) if declared else None
+
+    def chunks(self):
+        """Yield the body as decoded text, stopping at max_bytes or the body timeout"""
+        decoder = None
+        deadline = time.monotonic() + self.body_timeout
+        try:
+            for chunk in self.response.iter_content(chunk_size=FETCH_CHUNK_BYTES):
+                if not chunk:
+                    continue
+                if self.bytes_used + len(chunk) > self.max_bytes:
+                    chunk = chunk[:self.max_bytes - self.bytes_used]
+                    self.truncated = True
+                if decoder is None:
+                    if self.encoding is None:
+                        sniffed = _META_CHARSET.search(chunk[:4096])
+                        self.encoding = (_lookup(sniffed.group(1).decode("ascii")) if sniffed else None) or "utf-8"
+                    decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+                self.bytes_used += len(chunk)
+                self._update_fetched()
+                yield decoder.decode(chunk)
+                if self.truncated:
+                    break
+                if time.monotonic() > deadline:
+                    self.truncated = True
+                    break
+            else:
+                self.complete = True
+            if decoder is not None:
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+        finally:
+            self._update_fetched()
+            self.response.close()
+            if self.stats is not None:
+                self.stats.record(self)
+
+    def text(self):
+        """The whole (capped) body as one string"""
+        return "".join(self.chunks())
+
+    def _update_fetched(self):
+        raw = getattr(self.response, "raw", None)
+        try:
+            wire = raw.tell()
+        except Exception:
+            wire = 0
+        self.bytes_fetched = max(self.bytes_fetched, wire or self.bytes_used)
+
+# ============================================================================
+# FETCH STATISTICS
+# ============================================================================
+
+class FetchStats:
+    """Bytes fetched vs bytes used across every streamed page"""
+
+    def __init__(self):
+        self.pages = 0
+        self.rejected = 0
+        self.truncated = 0
+        self.stopped_early = 0
+        self.bytes_fetched = 0
+        self.bytes_used = 0
+        self.largest = 0
+        self._lock = threading.Lock()
+
+    def record(self, page, rejected=False):
+        with self._lock:
+            if rejected:
+                self.rejected += 1
+                return
+            self.pages += 1
+            self.truncated += int(page.truncated)
+            self.stopped_early += int(not page.complete and not page.truncated)
+            self.bytes_fetched += page.bytes_fetched
+            self.bytes_used += page.bytes_used
+            self.largest = max(self.largest, page.bytes_used)
+
+    def print_report(self):
+        with self._lock:
+            if not self.pages and not self.rejected:
+                return
+            print(f"\nDownloads: {self.pages} pages, {self.bytes_fetched / 1024:.0f} KB fetched, "
+                  f"{self.bytes_used / 1024:.0f} KB used (largest {self.largest / 1024:.0f} KB); "
+                  f"{self.stopped_early} stopped early by the extractor, {self.truncated} capped at "
+                  f"{FETCH_MAX_BYTES // 1024} KB, {self.rejected} non-HTML rejected")
+
+_default_stats = FetchStats()
+
+def get_fetch_stats():
+    return _default_stats
+
+def open_page(response, max_bytes=FETCH_MAX_BYTES, body_timeout=FETCH_BODY_TIMEOUT):
+    """Wrap a stream=True response as a StreamedPage; raises for HTTP errors and non-HTML content"""
+    try:
+        response.raise_for_status()
+    except requests.RequestException:
+        response.close()
+        raise
+    return StreamedPage(response, max_bytes, body_timeout, stats=_default_stats)
+
+def fetch_page(session, url, max_bytes=FETCH_MAX_BYTES, body_timeout=FETCH_BODY_TIMEOUT, **kwargs):
+    """GET url as a StreamedPage"""
+    return open_page(session.get(url, stream=True, **kwargs), max_bytes, body_timeout)
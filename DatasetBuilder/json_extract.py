@@ -0,0 +1,444 @@
+import json
+import re
+import threading
+
+ARGUMENT_KEYS = ["thesis", "supporting_claims", "counterarguments", "evidence"]
+
+# Escaped pairs first so an escaped quote or brace is consumed as one token
+_STRUCTURAL = re.compile(r'\\.|[{}"\\]', re.DOTALL)
+
+# ============================================================================
+# INCREMENTAL JSON OBJECT SCANNER
+# ============================================================================
+
+class JSONObjectScanner:
+    """Find complete top-level {...} objects in text that arrives in pieces
+
+    String-aware: braces inside JSON strings do not count, and quotes outside
+    an object (prose, apostrophes) are ignored. Only the structural
+    characters are visited, so the scan is a single linear pass.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.start = None
+
+    def feed(self, chunk):
+        """Consume more text and return the objects that were closed by it"""
+        offset = len(self.text)
+        self.text += chunk
+        found = []
+
+        pos = 0
+        if self.escape and chunk:
+            # The previous chunk ended on a backslash inside a string
+            self.escape = False
+            pos = 1
+
+        for match in _STRUCTURAL.finditer(chunk, pos):
+            token = match.group()
+            idx = offset + match.start()
+
+            if self.depth == 0:
+                if token == '{':
+                    self.depth = 1
+                    self.start = idx
+                continue
+
+            if self.in_string:
+                if token == '"':
+                    self.in_string = False
+                elif token == '\\':
+                    self.escape = True
+                continue
+
+            if token == '"':
+                self.in_string = True
+            elif token == '{':
+                self.depth += 1
+            elif token == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    found.append(self.text[self.start:idx + 1])
+                    self.start = None
+
+        return found
+
+# ============================================================================
+# LOCATING THE ANSWER IN A COMPLETE RESPONSE
+# ============================================================================
+
+LOCATE_MODES = ["first", "last", "best"]
+
+# Labels for responses generated with and without a schema constraint
+FREE_FORM = "free-form"
+CONSTRAINED = "constrained"
+
+_OBJECT_START = re.compile(r'\{\s*["}]')
+
+def _balanced_spans(text):
+    """Tree of balanced {...} spans as (start, end, children), outermost first
+
+    Braces left open at the end of the text (e.g. "{x" in reasoning prose)
+    are dropped and the spans inside them promoted, so they cannot hide the
+    answer that follows. Their positions are returned as the second value.
+    """
+    roots = []
+    opens = []
+    children = []
+    in_string = False
+    for match in _STRUCTURAL.finditer(text):
+        token = match.group()
+        if not opens:
+            if token == '{':
+                opens.append(match.start())
+                children.append([])
+            continue
+
+        if in_string:
+            if token == '"':
+                in_string = False
+            continue
+
+        if token == '"':
+            in_string = True
+        elif token == '{':
+            opens.append(match.start())
+            children.append([])
+        elif token == '}':
+            node = (opens.pop(), match.end(), children.pop())
+            (children[-1] if children else roots).append(node)
+
+    unclosed = list(opens)
+    while opens:
+        opens.pop()
+        orphans = children.pop()
+        (children[-1] if children else roots).extend(orphans)
+    return roots, unclosed
+
+def find_json_objects(text):
+    """All outermost balanced {...} spans in text, in order, found in one linear pass"""
+    text = text or ""
+    return [text[start:end] for start, end, _ in _balanced_spans(text)[0]]
+
+def parse_json_objects(text):
+    """JSON objects in text, in order
+
+    A span that does not parse (prose in braces, a set like {x | x > 0})
+    is searched for objects nested inside it instead.
+    """
+    text = text or ""
+    return _parse_spans(text, _balanced_spans(text)[0])[0]
+
+def _parse_spans(text, roots):
+    """Parsed objects, plus the starts of object-like spans that failed to parse"""
+    parsed = []
+    broken = []
+    pending = list(reversed(roots))
+    while pending:
+        start, end, kids = pending.pop()
+        try:
+            # Prose in braces is rejected from its first characters, without parsing
+            if not _OBJECT_START.match(text, start):
+                raise ValueError("not a JSON object")
+            obj = json.loads(text[start:end])
+        except ValueError:
+            if _REPAIRABLE_START.match(text, start):
+                broken.append(start)
+            pending.extend(reversed(kids))
+            continue
+        if isinstance(obj, dict):
+            parsed.append(obj)
+    return parsed, broken
+
+def extract_json_object(text, mode="best", score=None, repair=True, label=FREE_FORM, exclude=()):
+    """Pick the model's JSON answer out of free-form output, or None
+
+    mode "first" / "last" take the first / last object that parses; "best"
+    takes the highest score(obj) (default: argument_map_score), preferring
+    the later one on ties since models tend to restate the template before
+    answering. With repair=True, objects that fail to parse or are cut off
+    at the end of the output go through repair_json, and a salvaged object
+    competes with the parsed ones. Objects equal to one in exclude (the
+    examples of a few-shot prompt) are never picked. Outcomes are tallied
+    under label for repair_stats().
+    """
+    if mode not in LOCATE_MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {LOCATE_MODES}")
+    score = score or argument_map_score
+    text = text or ""
+    repairs = []
+    if "```" in text:
+        text = _FENCE.sub("", text)
+        repairs.append("markdown_fence")
+
+    roots, unclosed = _balanced_spans(text)
+    objects, broken = _parse_spans(text, roots)
+    objects = [obj for obj in objects if obj not in exclude]
+
+    salvaged = None
+    if repair:
+        # An object still open at the end of the output was cut off by max_tokens
+        broken += [start for start in unclosed if _REPAIRABLE_START.match(text, start)]
+        for start in broken[-MAX_REPAIR_ATTEMPTS:]:
+            obj, fixes = repair_json(text, start)
+            if obj is not None and obj not in exclude and (salvaged is None or score(obj) >= score(salvaged[0])):
+                salvaged = (obj, fixes)
+
+    if salvaged is not None and (not objects or score(salvaged[0]) > max(score(o) for o in objects)):
+        _tally(label, "salvaged", repairs + salvaged[1])
+        return salvaged[0]
+    if not objects:
+        _tally(label, "failed", repairs)
+        return None
+    _tally(label, "parsed", repairs)
+
+    if mode == "first":
+        return objects[0]
+    if mode == "last":
+        return objects[-1]
+
+    best = objects[0]
+    best_score = score(best)
+    for obj in objects[1:]:
+        obj_score = score(obj)
+        if obj_score >= best_score:
+            best, best_score = obj, obj_score
+    return best
+
+# ============================================================================
+# REPAIR
+# ============================================================================
+
+REPAIRS = ["markdown_fence", "single_quotes", "unescaped_newline", "trailing_comma", "truncated"]
+MAX_REPAIR_ATTEMPTS = 4
+
+_FENCE = re.compile(r"```[A-Za-z]*")
+_REPAIRABLE_START = re.compile(r"\{\s*[\"'}]")
+_CLOSERS = {'{': '}', '[': ']'}
+_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+def _ends_single_quoted(text, i):
+    """A ' closes a single-quoted string only before a delimiter, so apostrophes survive"""
+    j = i + 1
+    while j < len(text) and text[j] in ' \t\r\n':
+        j += 1
+    return j == len(text) or text[j] in ',:}]'
+
+def _drop_trailing_comma(out, fixes):
+    k = len(out) - 1
+    while k >= 0 and out[k].isspace():
+        k -= 1
+    if k >= 0 and out[k] == ',':
+        del out[k]
+        fixes.add("trailing_comma")
+
+def repair_json(text, start=0):
+    """Rewrite the object starting at text[start] into valid JSON, returning (obj, repairs)
+
+    One pass converts single-quoted strings, escapes raw newlines and tabs
+    inside strings and drops trailing commas. If the text ends before the
+    object closes (max_tokens), the open string is closed, any incomplete
+    trailing member is dropped and the brackets are closed. Returns
+    (None, []) when the result still does not parse to an object.
+    """
+    out = []
+    stack = []
+    fixes = set()
+    # Points to cut back to if the output was truncated: (len(out), open brackets)
+    commas = []
+    quote = None
+    i = start
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if quote:
+            if c == '\\':
+                # \' is only an escape inside single quotes; JSON wants a bare '
+                out.append("'" if text[i + 1:i + 2] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if c == quote and (quote == '"' or _ends_single_quoted(text, i)):
+                out.append('"')
+                quote = None
+            elif c == '"':
+                out.append('\\"')
+            elif c in _ESCAPES:
+                out.append(_ESCAPES[c])
+                fixes.add("unescaped_newline")
+            else:
+                out.append(c)
+        elif c in '"\'':
+            if c == "'":
+                fixes.add("single_quotes")
+            quote = c
+            out.append('"')
+        elif c in '{[':
+            stack.append(c)
+            out.append(c)
+        elif c in '}]':
+            if not stack:
+                break
+            _drop_trailing_comma(out, fixes)
+            out.append(_CLOSERS[stack.pop()])
+            if not stack:
+                break
+        elif c == ',':
+            commas.append((len(out), list(stack)))
+            out.append(c)
+        else:
+            out.append(c)
+        i += 1
+
+    if not stack:
+        attempts = ["".join(out)]
+    else:
+        fixes.add("truncated")
+        if quote:
+            out.append('"')
+        attempts = ["".join(out) + "".join(_CLOSERS[b] for b in reversed(stack))]
+        # An incomplete last member ("key": or a cut-off key) is dropped back to the previous comma
+        for cut, open_brackets in reversed(commas[-3:]):
+            attempts.append("".join(out[:cut]) + "".join(_CLOSERS[b] for b in reversed(open_brackets)))
+
+    for attempt in attempts:
+        try:
+            obj = json.loads(attempt)
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            return obj, sorted(fixes, key=REPAIRS.index)
+    return None, []
+
+_repair_counts = {}
+_repair_lock = threading.Lock()
+
+def _tally(label, outcome, repairs):
+    with _repair_lock:
+        counts = _repair_counts.setdefault(label, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        for repair in repairs:
+            counts[repair] = counts.get(repair, 0) + 1
+
+def repair_stats():
+    """Per label ("free-form" / "constrained"): responses parsed as-is, salvaged by
+    repair or lost, and how often each repair fired"""
+    with _repair_lock:
+        counts = {label: dict(c) for label, c in _repair_counts.items()}
+    return {label: {key: c.get(key, 0) for key in ["parsed", "salvaged", "failed"] + REPAIRS}
+            for label, c in sorted(counts.items())}
+
+def print_repair_report():
+    stats = repair_stats()
+    if not stats:
+        return
+
+    print(f"\n{'='*70}")
+    print("JSON PARSING")
+    print("="*70)
+    print(f"{'Output':<14} {'Responses':<11} {'Parsed':<9} {'Salvaged':<10} {'No JSON':<9} {'Failure rate'}")
+    print("-"*70)
+    for label, s in stats.items():
+        total = s["parsed"] + s["salvaged"] + s["failed"]
+        print(f"{label:<14} {total:<11} {s['parsed']:<9} {s['salvaged']:<10} {s['failed']:<9} "
+              f"{s['failed'] / total:.1%}")
+    for label, s in stats.items():
+        fired = ", ".join(f"{repair} {s[repair]}" for repair in REPAIRS if s[repair])
+        if fired:
+            print(f"Repairs fired ({label}): {fired}")
+
+# ============================================================================
+# SCHEMA CHECK
+# ============================================================================
+
+# Structured-output constraint for extraction requests
+ARGUMENT_MAP_SCHEMA = {
+    "type": "object",
+    "properties": {key: {"type": "array", "items": {"type": "string"}} for key in ARGUMENT_KEYS},
+    "required": ARGUMENT_KEYS,
+    "additionalProperties": False,
+}
+
+def normalize_argument_map(arg_map):
+    """Give every category a list of non-empty strings
+
+    Missing categories become empty lists and scalars one-item lists; items
+    that are dicts or lists (e.g. {"claim": ..., "details": ...} evidence)
+    are flattened by joining their values.
+    """
+    for key in ARGUMENT_KEYS:
+        if key not in arg_map:
+            arg_map[key] = []
+        elif not isinstance(arg_map[key], list):
+            arg_map[key] = [str(arg_map[key])]
+
+        cleaned_items = []
+        for item in arg_map[key]:
+            if isinstance(item, dict):
+                cleaned_items.append(' '.join(str(v) for v in item.values() if v))
+            elif isinstance(item, list):
+                cleaned_items.append(' '.join(str(i) for i in item if i))
+            else:
+                cleaned_items.append(str(item))
+
+        arg_map[key] = [item.strip() for item in cleaned_items if item and item.strip()]
+    return arg_map
+
+def parse_argument_map(content, constrained=False, prompt=None):
+    """Normalized argument map from a model response, or None
+
+    Schema-constrained output is the JSON object itself and is parsed
+    directly; anything else (or constrained output that still fails to
+    parse) goes through extract_json_object. With prompt given, objects
+    that also parse out of the prompt (echoed few-shot examples) are
+    skipped.
+    """
+    label = CONSTRAINED if constrained else FREE_FORM
+    if constrained:
+        try:
+            arg_map = json.loads(content)
+        except (TypeError, ValueError):
+            arg_map = None
+        if isinstance(arg_map, dict):
+            _tally(label, "parsed", [])
+            return normalize_argument_map(arg_map)
+
+    exclude = parse_json_objects(prompt) if prompt else ()
+    arg_map = extract_json_object(content, label=label, exclude=exclude)
+    if arg_map is None:
+        return None
+    return normalize_argument_map(arg_map)
+
+def argument_map_score(obj):
+    """Rank candidate objects: non-empty argument categories first, then categories present"""
+    if not isinstance(obj, dict):
+        return (0, 0)
+    present = [key for key in ARGUMENT_KEYS if key in obj]
+    return (sum(1 for key in present if obj[key]), len(present))
+
+def is_argument_map(obj):
+    """True for a dict that looks like a filled-in argument map
+
+    The prompt's empty template ({"thesis": [], ...}) is echoed by some
+    models before their real answer, so at least one category must be
+    non-empty.
+    """
+    if not isinstance(obj, dict):
+        return False
+    present = [key for key in ARGUMENT_KEYS if key in obj]
+    if not present:
+        return False
+    return any(obj[key] for key in present)
+
+def is_answer_to(prompt):
+    """Early-stop predicate for prompt: is_argument_map() minus the prompt's own objects
+
+    A few-shot prompt contains filled example maps, and small models often
+    repeat one before answering; an object that also parses out of the
+    prompt is never taken as the answer.
+    """
+    prompt_objects = parse_json_objects(prompt)
+    return lambda obj: is_argument_map(obj) and obj not in prompt_objects
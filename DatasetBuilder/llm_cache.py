@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH", os.path.join(_script_dir, 'data', 'cache', 'llm_responses.sqlite')
+)
+LLM_CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "512"))
+
+# use     - read cached responses and store new ones
+# refresh - always call the model, overwrite what is cached (re-sampling at temperature > 0)
+# off     - neither read nor write
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "use")
+CACHE_MODES = ["use", "refresh", "off"]
+
+# ============================================================================
+# PERSISTENT RESPONSE CACHE
+# ============================================================================
+
+class LLMCache:
+    """SQLite-backed cache of chat-completion results
+
+    Keyed by (system, model, prompt hash, temperature, max_tokens). When the stored
+    content exceeds max_mb, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_mb=LLM_CACHE_MAX_MB, mode=LLM_CACHE_MODE):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                temperature REAL,
+                max_tokens INTEGER,
+                content TEXT,
+                size INTEGER,
+                created REAL,
+                last_used REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens, extra=None, system=None):
+        """Content address for one request: the full prompt plus sampling settings
+
+        system names the caller (e.g. "react", "multi_agent") so that systems
+        being compared each draw their own samples for the same prompt
+        instead of replaying another system's; None is the static sweep's.
+        """
+        prompt_blob = json.dumps({"messages": messages, "extra": extra or {}},
+                                 sort_keys=True, ensure_ascii=False)
+        prompt_hash = hashlib.sha256(prompt_blob.encode('utf-8')).hexdigest()
+        key = f"{model}|{prompt_hash}|{temperature}|{max_tokens}"
+        return f"{system}|{key}" if system else key
+
+    def get(self, key):
+        """Return cached content, or None on a miss (or when reads are disabled)"""
+        if self.mode != "use":
+            return None
+
+        with self._lock:
+            row = self.conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, model, temperature, max_tokens, content):
+        if self.mode == "off" or content is None:
+            return
+
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, temperature, max_tokens, content, size, now, now)
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used rows until we are back under 90% of the budget
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= target:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def stats(self):
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_mb": size / (1024 * 1024),
+        }
+
+    def print_report(self):
+        s = self.stats()
+        print(f"\nLLM cache ({s['mode']}): {s['hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate']*100:.1f}% hit rate), {s['evictions']} evicted, "
+              f"{s['entries']} entries / {s['size_mb']:.1f} MB")
+
+# ============================================================================
+# SHARED DEFAULT CACHE
+# ============================================================================
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache():
+    """Return the process-wide cache, opening it on first use"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+def set_cache_mode(mode):
+    """Switch the shared cache between use / refresh / off"""
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+    get_cache().mode = mode
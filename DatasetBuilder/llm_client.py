@@ -0,0 +1,457 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    from .chunking import count_tokens
+    from .concurrency import LLM_INITIAL_CONCURRENCY, LLM_MAX_CONCURRENCY, AdaptiveConcurrencyLimiter
+    from .json_extract import JSONObjectScanner
+    from .llm_cache import get_cache
+except ImportError:  # run as a script from DatasetBuilder/
+    from chunking import count_tokens
+    from concurrency import LLM_INITIAL_CONCURRENCY, LLM_MAX_CONCURRENCY, AdaptiveConcurrencyLimiter
+    from json_extract import JSONObjectScanner
+    from llm_cache import get_cache
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "http://localhost:11434")
+CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "8"))
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", "90"))
+LLM_STREAM = os.environ.get("LLM_STREAM", "0") == "1"
+
+# Retry and hedging policy
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "20"))
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "0") == "1"
+
+# Send a JSON schema as response_format when the caller provides one
+LLM_STRUCTURED_OUTPUT = os.environ.get("LLM_STRUCTURED_OUTPUT", "0") == "1"
+LLM_HEDGE_MIN_SAMPLES = 20   # successful calls seen before hedging starts
+LLM_HEDGE_WINDOW = 500       # recent calls the p95 is taken over
+
+TAIL_EVENTS = ["calls", "retries", "hedges", "hedge_wins", "failures"]
+
+class _Cancelled(Exception):
+    """Raised inside a hedged attempt that lost the race"""
+
+def _rejects_schema(error):
+    """A 400/422 answer to a request carrying response_format"""
+    return isinstance(error, requests.HTTPError) and error.response is not None \
+        and error.response.status_code in (400, 422)
+
+def _outcome(error):
+    """Classify a failed request for the limiter: "overload" failures are also worth retrying"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return "overload"
+    if isinstance(error, requests.HTTPError) and error.response is not None \
+            and (error.response.status_code >= 500 or error.response.status_code == 429):
+        return "overload"
+    return "error"
+
+# ============================================================================
+# POOLED CLIENT
+# ============================================================================
+
+class LLMClient:
+    """Keep-alive, connection-pooled client for the OpenAI-compatible chat endpoint"""
+
+    def __init__(self, base_url=LLM_BASE_URL, pool_size=LLM_POOL_SIZE,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT, cache=None,
+                 streaming=LLM_STREAM, max_concurrency=LLM_MAX_CONCURRENCY, retries=LLM_RETRIES,
+                 hedge=LLM_HEDGE, structured=LLM_STRUCTURED_OUTPUT, initial_concurrency=LLM_INITIAL_CONCURRENCY):
+        self.base_url = base_url.rstrip('/')
+        self.chat_url = self.base_url + CHAT_COMPLETIONS_PATH
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # An LLMCache, or a function returning one that is called on the first cached request
+        self._cache = cache
+        self.streaming = streaming
+        self.max_concurrency = max_concurrency
+        # Batch runners start each model at 1 and let the limiter probe upwards;
+        # an interactive server starts near its pool size so requests are not queued
+        self.initial_concurrency = initial_concurrency
+        self.retries = max(0, retries)
+        self.hedge = hedge
+        self.structured = structured
+        self.schema_unsupported = set()
+        self.limiters = {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.calls = []
+        self.tail_counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        if callable(self._cache):
+            with self._lock:
+                if callable(self._cache):
+                    self._cache = self._cache()
+        return self._cache
+
+    def chat(self, model, messages, temperature=0.2, max_tokens=1500, timeout=None, cache=False,
+             early_stop=None, strategy=None, schema=None, retries=None, system=None, **extra):
+        """Send one chat completion request and return the message content
+
+        With cache=True the response cache is consulted first and successful
+        responses are stored in it, under the caller's system name if given. When the client is in streaming mode and
+        early_stop is given, the response is streamed and the connection is
+        closed as soon as a complete JSON object satisfying early_stop(obj)
+        has arrived; the content received up to that point is returned.
+
+        Timeouts, dropped connections, 429 and 5xx responses are retried up to
+        self.retries times (or retries, if given) with exponential backoff and
+        full jitter; interactive callers pass retries=0 to fail fast. With
+        hedging on, a call still running after the model's observed p95
+        latency gets a duplicate request and the slower of the two is
+        cancelled. strategy only labels the retry and hedge counts.
+
+        In structured mode a schema is sent as an OpenAI-style json_schema
+        response_format. If the server rejects it (400/422) the model is
+        marked unsupported and the call is repeated free-form; use
+        uses_schema(model) to tell which kind of output came back.
+        """
+        constrained = schema is not None and self.uses_schema(model)
+        if constrained:
+            extra = dict(extra, response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": schema, "strict": True},
+            })
+
+        key = None
+        if cache and self.cache is not None:
+            key = self.cache.make_key(model, messages, temperature, max_tokens, extra, system)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        payload.update(extra)
+
+        label = (model, strategy or "-", "constrained" if constrained else "free-form")
+        self._count(label, "calls")
+        retries = self.retries if retries is None else max(0, retries)
+        for attempt in range(retries + 1):
+            try:
+                content = self._hedged_call(model, payload, timeout, early_stop, label)
+                break
+            except requests.RequestException as e:
+                if constrained and _rejects_schema(e):
+                    with self._lock:
+                        self.schema_unsupported.add(model)
+                    print(f"   ⚠️ {model}: response_format not supported, falling back to free-form output")
+                    extra.pop("response_format")
+                    return self.chat(model, messages, temperature, max_tokens, timeout, cache, early_stop,
+                                     strategy, schema, retries, system, **extra)
+                if attempt == retries or _outcome(e) != "overload":
+                    self._count(label, "failures")
+                    raise
+                self._count(label, "retries")
+                time.sleep(self._backoff(attempt))
+
+        if key is not None:
+            self.cache.put(key, model, temperature, max_tokens, content)
+        return content
+
+    def _hedged_call(self, model, payload, timeout, early_stop, label):
+        """Run one attempt, racing a duplicate against it if it runs past the hedge delay"""
+        limiter = self.limiter(model)
+        delay = self.hedge_delay(model, payload["max_tokens"]) if self.hedge else None
+        if delay is None:
+            streamed = self.streaming and early_stop is not None
+            return self._attempt(model, dict(payload), timeout, early_stop, streamed, limiter.acquire())
+
+        # Hedged attempts are always streamed so the loser can be cancelled mid-generation
+        finished = queue.Queue()
+        cancels = []
+
+        def launch(started):
+            cancel = threading.Event()
+            cancels.append(cancel)
+
+            def run():
+                try:
+                    content = self._attempt(model, dict(payload), timeout, early_stop, True, started, cancel)
+                    finished.put((cancel, content, None))
+                except Exception as e:
+                    finished.put((cancel, None, e))
+
+            threading.Thread(target=run, daemon=True).start()
+
+        launch(limiter.acquire())
+        try:
+            winner, content, error = finished.get(timeout=delay)
+        except queue.Empty:
+            # Only hedge when the limiter has a spare slot, never on an overloaded server
+            started = limiter.acquire(blocking=False)
+            if started is not None:
+                self._count(label, "hedges")
+                launch(started)
+            winner, content, error = finished.get()
+            if error is not None and len(cancels) > 1:
+                winner, content, error = finished.get()
+            if error is None and len(cancels) > 1 and winner is cancels[1]:
+                self._count(label, "hedge_wins")
+
+        for cancel in cancels:
+            if cancel is not winner:
+                cancel.set()
+        if error is not None:
+            raise error
+        return content
+
+    def _attempt(self, model, payload, timeout, early_stop, streamed, started, cancel=None):
+        """Send one HTTP request in a limiter slot already taken at started"""
+        timeouts = (self.connect_timeout, timeout or self.read_timeout)
+        timings = {"prompt_tokens": sum(count_tokens(m.get("content", "")) for m in payload["messages"])}
+        limiter = self.limiter(model)
+        outcome = "error"
+        start = time.perf_counter()
+        ok = False
+        try:
+            if streamed:
+                content = self._stream(payload, timeouts, early_stop, start, timings, cancel)
+            else:
+                resp = self.session.post(self.chat_url, json=payload, timeout=timeouts)
+                resp.raise_for_status()
+                data = resp.json()
+                content = data["choices"][0]["message"]["content"]
+                # Prefer the server's own count when it reports usage
+                timings["prompt_tokens"] = (data.get("usage") or {}).get("prompt_tokens", timings["prompt_tokens"])
+            ok = True
+            outcome = "ok"
+        except _Cancelled:
+            outcome = "cancelled"
+            raise
+        except requests.RequestException as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            # Latency depends heavily on the output budget, so baselines are kept per budget
+            limiter.release(started, outcome, kind=(payload["max_tokens"], streamed))
+            if outcome != "cancelled":
+                self._record(model, time.perf_counter() - start, ok,
+                             max_tokens=payload["max_tokens"], **timings)
+
+        return content
+
+    def hedge_delay(self, model, max_tokens):
+        """Observed p95 latency of recent successful calls like this one, or None while warming up"""
+        with self._lock:
+            latencies = [c["latency"] for c in self.calls[-LLM_HEDGE_WINDOW:]
+                         if c["model"] == model and c["ok"] and c.get("max_tokens") == max_tokens]
+        if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return float(np.percentile(latencies, 95))
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]"""
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    def uses_schema(self, model):
+        """True when calls to model with a schema get schema-constrained output"""
+        with self._lock:
+            return self.structured and model not in self.schema_unsupported
+
+    def _count(self, label, event):
+        with self._lock:
+            counts = self.tail_counts.setdefault(label, dict.fromkeys(TAIL_EVENTS, 0))
+            counts[event] += 1
+
+    def limiter(self, model):
+        """Adaptive in-flight limit for one model (created on first use)"""
+        with self._lock:
+            if model not in self.limiters:
+                self.limiters[model] = AdaptiveConcurrencyLimiter(initial_limit=self.initial_concurrency,
+                                                                 max_limit=self.max_concurrency)
+            return self.limiters[model]
+
+    def concurrency_snapshot(self):
+        """Current in-flight count and target limit per model"""
+        with self._lock:
+            limiters = dict(self.limiters)
+        return {model: limiter.snapshot() for model, limiter in sorted(limiters.items())}
+
+    def _stream(self, payload, timeouts, early_stop, start, timings, cancel=None):
+        """Read a server-sent-events completion, stopping at the first accepted JSON object
+
+        Setting cancel abandons the stream at the next line received.
+        """
+        payload["stream"] = True
+        scanner = JSONObjectScanner()
+        parts = []
+
+        # Leaving the with-block closes the connection, which tells the server to stop generating
+        with self.session.post(self.chat_url, json=payload, timeout=timeouts, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    raise _Cancelled()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content") or ""
+                if not delta:
+                    continue
+                if "ttft" not in timings:
+                    timings["ttft"] = time.perf_counter() - start
+                parts.append(delta)
+                if early_stop is None:
+                    continue
+
+                for candidate in scanner.feed(delta):
+                    try:
+                        obj = json.loads(candidate)
+                    except ValueError:
+                        continue
+                    if early_stop(obj):
+                        timings["time_to_json"] = time.perf_counter() - start
+                        return "".join(parts)
+
+        return "".join(parts)
+
+    def _record(self, model, latency, ok, **timings):
+        with self._lock:
+            self.calls.append(dict({"model": model, "latency": latency, "ok": ok}, **timings))
+
+    def latency_stats(self):
+        """Per-model call count, error count and latency percentiles (seconds)"""
+        with self._lock:
+            calls = list(self.calls)
+
+        stats = {}
+        for model in sorted({c["model"] for c in calls}):
+            model_calls = [c for c in calls if c["model"] == model]
+            latencies = [c["latency"] for c in model_calls]
+            stats[model] = {
+                "calls": len(latencies),
+                "errors": sum(1 for c in model_calls if not c["ok"]),
+                "mean": float(np.mean(latencies)),
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "max": float(np.max(latencies)),
+                "mean_prompt_tokens": float(np.mean([c.get("prompt_tokens", 0) for c in model_calls])),
+            }
+
+            # Streaming calls only
+            ttfts = [c["ttft"] for c in model_calls if "ttft" in c]
+            if ttfts:
+                json_times = [c["time_to_json"] for c in model_calls if "time_to_json" in c]
+                stats[model]["streamed"] = len(ttfts)
+                stats[model]["early_stops"] = len(json_times)
+                stats[model]["mean_ttft"] = float(np.mean(ttfts))
+                stats[model]["mean_time_to_json"] = float(np.mean(json_times)) if json_times else None
+        return stats
+
+    def tail_stats(self):
+        """Calls, retries, hedges, hedge wins and final failures per (model, strategy, output)"""
+        with self._lock:
+            return {label: dict(counts) for label, counts in sorted(self.tail_counts.items())}
+
+    def print_latency_report(self):
+        stats = self.latency_stats()
+        if not stats:
+            return
+
+        print(f"\n{'='*70}")
+        print("LLM CALL LATENCY")
+        print("="*70)
+        print(f"{'Model':<15} {'Calls':<8} {'Errors':<8} {'Mean':<10} {'p50':<10} {'p95':<10} {'Max':<10} "
+              f"{'Prompt tok'}")
+        print("-"*70)
+        for model, s in stats.items():
+            print(f"{model:<15} {s['calls']:<8} {s['errors']:<8} {s['mean']:<10.2f} "
+                  f"{s['p50']:<10.2f} {s['p95']:<10.2f} {s['max']:<10.2f} {s['mean_prompt_tokens']:.0f}")
+
+        streamed = {model: s for model, s in stats.items() if "streamed" in s}
+        if streamed:
+            print("-"*70)
+            print(f"{'Model':<15} {'Streamed':<10} {'Early stop':<12} {'TTFT':<10} {'Time to JSON'}")
+            for model, s in streamed.items():
+                json_time = f"{s['mean_time_to_json']:.2f}" if s["mean_time_to_json"] is not None else "-"
+                print(f"{model:<15} {s['streamed']:<10} {s['early_stops']:<12} {s['mean_ttft']:<10.2f} {json_time}")
+
+        concurrency = self.concurrency_snapshot()
+        if concurrency:
+            print("-"*70)
+            print(f"{'Model':<15} {'Limit':<8} {'Peak in flight':<16} {'Increases':<12} {'Decreases'}")
+            for model, c in concurrency.items():
+                print(f"{model:<15} {c['limit']:<8} {c['peak_in_flight']:<16} {c['increases']:<12} {c['decreases']}")
+
+        tail = self.tail_stats()
+        if tail:
+            print("-"*70)
+            print(f"{'Model':<15} {'Strategy':<22} {'Output':<13} {'Calls':<7} {'Retries':<9} {'Hedges':<8} "
+                  f"{'Hedge wins':<12} {'Failures'}")
+            for (model, strategy, output), t in tail.items():
+                print(f"{model:<15} {strategy:<22} {output:<13} {t['calls']:<7} {t['retries']:<9} {t['hedges']:<8} "
+                      f"{t['hedge_wins']:<12} {t['failures']}")
+            for output in sorted({label[2] for label in tail}):
+                calls = sum(t["calls"] for label, t in tail.items() if label[2] == output)
+                retries = sum(t["retries"] for label, t in tail.items() if label[2] == output)
+                print(f"Retry rate ({output}): {retries / calls:.1%} of {calls} calls")
+
+# ============================================================================
+# SHARED DEFAULT CLIENT
+# ============================================================================
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide client so every call site shares one pool"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            # The response cache is opened only if a call asks for it
+            _default_client = LLMClient(cache=get_cache)
+        return _default_client
+
+def configure_client(**kwargs):
+    """Replace the shared client, e.g. to size the pool for a concurrent run"""
+    global _default_client
+    kwargs.setdefault("cache", get_cache)
+    with _default_lock:
+        _default_client = LLMClient(**kwargs)
+        return _default_client
+
+def chat(model, prompt, temperature=0.2, max_tokens=1500, timeout=None, cache=False, strategy=None, schema=None,
+         retries=None, system=None, **extra):
+    """Send a single-turn user prompt through the shared client"""
+    return get_client().chat(
+        model,
+        [{"role": "user", "content": prompt}],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        cache=cache,
+        strategy=strategy,
+        schema=schema,
+        retries=retries,
+        system=system,
+        **extra
+    )
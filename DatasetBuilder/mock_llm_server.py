@@ -0,0 +1,271 @@
+"""
+Stand-in for Ollama's OpenAI-compatible API, for benchmarking the pipeline without a GPU.
+
+Serves /v1/chat/completions (plain and stream: true) and Ollama's native /api/chat,
+answering with canned or synthesized argument-map JSON after a configurable delay.
+Point any runner (or pap.py) at it with the LLM_BASE_URL environment variable:
+
+    python mock_llm_server.py --port 11500 --latency lognormal --latency-mean 2 --tokens-per-sec 40
+    LLM_BASE_URL=http://127.0.0.1:11500 python comprehensive_extraction_system.py --concurrency-per-model 4
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+app = Flask(__name__)
+
+CONFIG = {
+    "latency": "fixed",        # fixed | uniform | lognormal
+    "latency_mean": 0.5,       # seconds before the first token
+    "latency_jitter": 0.25,    # uniform half-width, or lognormal sigma
+    "tokens_per_sec": 0.0,     # 0 = the whole answer is available at once
+    "error_rate": 0.0,         # fraction of requests answered with HTTP 500
+    "malformed_rate": 0.0,     # fraction of answers with broken JSON
+    "prose_tokens": 0,         # reasoning-style filler before and after the JSON
+    "canned": [],              # argument maps to serve instead of synthesizing
+    "structured": True,        # honour response_format (False = answer 400 like an old server)
+}
+
+rng = random.Random()
+rng_lock = threading.Lock()
+
+STATS = {"requests": 0, "errors": 0, "malformed": 0, "in_flight": 0, "max_in_flight": 0}
+stats_lock = threading.Lock()
+
+# ============================================================================
+# RESPONSE SYNTHESIS
+# ============================================================================
+
+def _rand():
+    with rng_lock:
+        return rng.random()
+
+def sample_latency():
+    mean = CONFIG["latency_mean"]
+    jitter = CONFIG["latency_jitter"]
+    with rng_lock:
+        if CONFIG["latency"] == "uniform":
+            return max(0.0, rng.uniform(mean - jitter, mean + jitter))
+        if CONFIG["latency"] == "lognormal":
+            # Parameterised so the median equals latency_mean
+            return rng.lognormvariate(0, jitter) * mean
+    return mean
+
+def synthesize_argument_map(prompt):
+    """Build an argument map from sentences of the article embedded in the prompt"""
+    if CONFIG["canned"]:
+        with rng_lock:
+            return rng.choice(CONFIG["canned"])
+
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', prompt) if 40 <= len(s.strip()) <= 300]
+    if not sentences:
+        sentences = ["The article does not state a clear position."]
+    with rng_lock:
+        picked = rng.sample(sentences, min(len(sentences), 8))
+    return {
+        "thesis": picked[:1],
+        "supporting_claims": picked[1:4],
+        "counterarguments": picked[4:5],
+        "evidence": picked[5:8],
+    }
+
+def synthesize_elements_map(prompt):
+    """pap.py asks for a title/elements map instead of the four-key one"""
+    arg_map = synthesize_argument_map(prompt)
+    elements = [{"id": "thesis-1", "type": "Thesis", "parentId": None,
+                 "content": (arg_map["thesis"] or [""])[0] + " [Source 1]",
+                 "sourceText": (arg_map["thesis"] or [""])[0]}]
+    for i, claim in enumerate(arg_map["supporting_claims"], 1):
+        elements.append({"id": f"claim-{i}", "type": "Supporting Claim", "parentId": "thesis-1",
+                         "content": claim + " [Source 1]", "sourceText": claim})
+    return {"title": "Mock argument map", "elements": elements}
+
+def malform(text):
+    """Break the JSON the way small models do"""
+    with rng_lock:
+        kind = rng.choice(["trailing_comma", "single_quotes", "truncated", "fenced", "no_json"])
+    if kind == "trailing_comma":
+        return text[:-1].rstrip() + ",}"
+    if kind == "single_quotes":
+        return text.replace('"', "'")
+    if kind == "truncated":
+        return text[:max(1, int(len(text) * 0.7))]
+    if kind == "fenced":
+        return "```json\n" + text + "\n```"
+    return "I could not find any arguments in this article."
+
+def build_content(prompt, constrained=False):
+    if "'elements'" in prompt:
+        answer = json.dumps(synthesize_elements_map(prompt), ensure_ascii=False)
+    else:
+        answer = json.dumps(synthesize_argument_map(prompt), ensure_ascii=False)
+    if constrained:
+        # Constrained decoding emits exactly the object
+        return answer, False
+
+    malformed = _rand() < CONFIG["malformed_rate"]
+    if malformed:
+        answer = malform(answer)
+
+    if CONFIG["prose_tokens"]:
+        prose = " ".join(["Reasoning"] * CONFIG["prose_tokens"])
+        answer = f"{prose}\n\n{answer}\n\n{prose}"
+    return answer, malformed
+
+def tokenize(text):
+    return re.findall(r'\S+\s*|\s+', text)
+
+# ============================================================================
+# ROUTES
+# ============================================================================
+
+def _begin_request():
+    with stats_lock:
+        STATS["requests"] += 1
+        STATS["in_flight"] += 1
+        STATS["max_in_flight"] = max(STATS["max_in_flight"], STATS["in_flight"])
+
+def _end_request(error=False, malformed=False):
+    with stats_lock:
+        STATS["in_flight"] -= 1
+        STATS["errors"] += int(error)
+        STATS["malformed"] += int(malformed)
+
+def _prompt_of(body):
+    return "\n".join(m.get("content", "") for m in body.get("messages", []))
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    body = request.get_json(force=True)
+    model = body.get("model", "mock")
+    prompt = _prompt_of(body)
+    constrained = body.get("response_format", {}).get("type") in ("json_schema", "json_object")
+    if constrained and not CONFIG["structured"]:
+        return jsonify({"error": {"message": "response_format is not supported"}}), 400
+    _begin_request()
+
+    time.sleep(sample_latency())
+    if _rand() < CONFIG["error_rate"]:
+        _end_request(error=True)
+        return jsonify({"error": {"message": "mock server error"}}), 500
+
+    content, malformed = build_content(prompt, constrained)
+    tokens = tokenize(content)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    usage = {"prompt_tokens": len(tokenize(prompt)), "completion_tokens": len(tokens),
+             "total_tokens": len(tokenize(prompt)) + len(tokens)}
+    delay = 1.0 / CONFIG["tokens_per_sec"] if CONFIG["tokens_per_sec"] > 0 else 0.0
+
+    if not body.get("stream"):
+        time.sleep(delay * len(tokens))
+        _end_request(malformed=malformed)
+        return jsonify({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def generate():
+        try:
+            for token in tokens:
+                time.sleep(delay)
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            done = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            # Also runs when the client disconnects early
+            _end_request(malformed=malformed)
+
+    return Response(generate(), mimetype='text/event-stream')
+
+@app.route('/api/chat', methods=['POST'])
+def native_chat():
+    """Ollama's native endpoint, with synthetic prompt-eval timings"""
+    body = request.get_json(force=True)
+    prompt = _prompt_of(body)
+    _begin_request()
+
+    latency = sample_latency()
+    time.sleep(latency)
+    content, malformed = build_content(prompt)
+    _end_request(malformed=malformed)
+
+    return jsonify({
+        "model": body.get("model", "mock"),
+        "message": {"role": "assistant", "content": content},
+        "done": True,
+        "prompt_eval_count": len(tokenize(prompt)),
+        "prompt_eval_duration": int(latency * 1e9),
+        "eval_count": len(tokenize(content)),
+    })
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with stats_lock:
+        return jsonify(dict(STATS))
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server for throughput benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default=CONFIG["latency"])
+    parser.add_argument("--latency-mean", type=float, default=CONFIG["latency_mean"],
+                        help="Seconds before the first token (median for lognormal)")
+    parser.add_argument("--latency-jitter", type=float, default=CONFIG["latency_jitter"],
+                        help="Half-width for uniform, sigma for lognormal")
+    parser.add_argument("--tokens-per-sec", type=float, default=CONFIG["tokens_per_sec"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--malformed-rate", type=float, default=CONFIG["malformed_rate"])
+    parser.add_argument("--prose-tokens", type=int, default=CONFIG["prose_tokens"],
+                        help="Filler words before and after the JSON, like chain-of-thought output")
+    parser.add_argument("--canned", help="JSON file of extraction results (e.g. a static_models output) to serve")
+    parser.add_argument("--no-structured", action="store_true",
+                        help="Reject response_format with HTTP 400, like a server without structured outputs")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    CONFIG.update({
+        "latency": args.latency,
+        "latency_mean": args.latency_mean,
+        "latency_jitter": args.latency_jitter,
+        "tokens_per_sec": args.tokens_per_sec,
+        "error_rate": args.error_rate,
+        "malformed_rate": args.malformed_rate,
+        "prose_tokens": args.prose_tokens,
+        "structured": not args.no_structured,
+    })
+    if args.canned:
+        with open(args.canned, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        CONFIG["canned"] = [e.get("argument_map", e) for e in entries]
+    rng.seed(args.seed)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    print(f"Mock LLM server on http://{args.host}:{args.port} "
+          f"(latency {args.latency} {args.latency_mean}s, {args.tokens_per_sec or '∞'} tok/s, "
+          f"errors {args.error_rate:.0%}, malformed {args.malformed_rate:.0%})")
+    print(f"Point the runners at it with: LLM_BASE_URL=http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
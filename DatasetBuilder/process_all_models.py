@@ -1,12 +1,10 @@
-import requests
 import json
-import re
 import os
-import time
-from bs4 import BeautifulSoup
 from tqdm import tqdm
-
-LLM_API_URL = "http://localhost:11434/v1/chat/completions"
+from article_store import get_article_store, scrape_article
+from chunking import article_token_budget, pack_text
+from json_extract import ARGUMENT_MAP_SCHEMA, parse_argument_map, print_repair_report
+from llm_client import chat, get_client
 
 # ============================================================================
 # ALL PROMPTS (BASELINE + 6 ADVANCED)
@@ -216,67 +214,19 @@ PROMPTS = {
     "recursive": {"prompt": RECURSIVE_PROMPT, "temperature": 0.3}
 }
 
-# ============================================================================
-# SCRAPING FUNCTION
-# ============================================================================
-
-def scrape_article(url):
-    """Scrape article content from URL"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'lxml')
-        title = soup.find('title').get_text() if soup.find('title') else ''
-        paragraphs = soup.find_all('p')
-        content = " ".join([p.get_text() for p in paragraphs[:15]])
-        
-        if len(content) < 200:
-            return None, None
-        
-        return title, content
-        
-    except Exception as e:
-        return None, None
-
 # ============================================================================
 # EXTRACTION FUNCTION
 # ============================================================================
 
-def extract_arguments(text, prompt_template, temperature=0.2):
+def extract_arguments(text, prompt_template, temperature=0.2, strategy=None):
     """Extract arguments using specified prompt"""
-    prompt = prompt_template.format(text=text[:3500])
-    
-    payload = {
-        "model": "llama3.1",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": temperature,
-        "max_tokens": 1500,
-    }
+    prompt = prompt_template.format(text=pack_text(text, article_token_budget("llama3.1", prompt_template, 1500)))
     
     try:
-        resp = requests.post(LLM_API_URL, json=payload, timeout=90)
-        resp.raise_for_status()
-        content = resp.json()["choices"][0]["message"]["content"]
-        
-        match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-        if not match:
-            return None
+        content = chat("llama3.1", prompt, temperature=temperature, max_tokens=1500, timeout=90,
+                       strategy=strategy, schema=ARGUMENT_MAP_SCHEMA)
         
-        arg_map = json.loads(match.group(0))
-        
-        for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-            if key not in arg_map:
-                arg_map[key] = []
-            elif not isinstance(arg_map[key], list):
-                arg_map[key] = [str(arg_map[key])]
-            arg_map[key] = [item.strip() for item in arg_map[key] if item and item.strip()]
-        
-        return arg_map
+        return parse_argument_map(content, get_client().uses_schema("llama3.1"), prompt)
         
     except Exception as e:
         return None
@@ -338,7 +288,8 @@ def main():
             arg_map = extract_arguments(
                 full_text, 
                 config["prompt"], 
-                temperature=config["temperature"]
+                temperature=config["temperature"],
+                strategy=prompt_name
             )
             
             if arg_map:
@@ -354,8 +305,6 @@ def main():
                 print(f"   ✓ {prompt_name} done")
             else:
                 print(f"   ⚠️ {prompt_name} failed")
-            
-            time.sleep(1)  # Rate limiting
         
         print(f"   ✅ All models completed")
     
@@ -372,6 +321,10 @@ def main():
             json.dump(prompt_results, f, indent=2, ensure_ascii=False)
         print(f"✓ {prompt_name.replace('_', ' ').title()}: {len(prompt_results)} articles → {prompt_name}_model.json")
     
+    get_client().print_latency_report()
+    get_article_store().print_report()
+    print_repair_report()
+    
     print(f"\n✅ ALL DONE! Now run compare_all_models.py to see results.\n")
 
 if __name__ == "__main__":
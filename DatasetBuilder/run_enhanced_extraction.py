@@ -1,10 +1,9 @@
-import requests
 import json
-import re
 import os
 from tqdm import tqdm
-
-LLM_API_URL = "http://localhost:11434/v1/chat/completions"
+from chunking import article_token_budget, pack_text
+from json_extract import ARGUMENT_MAP_SCHEMA, parse_argument_map, print_repair_report
+from llm_client import chat, get_client
 
 # Enhanced prompt for better extraction
 ENHANCED_PROMPT = """You are an expert argument analyst specializing in identifying logical structures in persuasive texts. Your task is to extract arguments from news articles with precision and completeness.
@@ -39,37 +38,14 @@ JSON Output:"""
 
 def extract_argument_map_enhanced(text):
     """Extract arguments using enhanced model"""
-    prompt = ENHANCED_PROMPT.format(text=text[:3500])
-    
-    payload = {
-        "model": "llama3.1",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.1,
-        "max_tokens": 1500,
-    }
+    prompt = ENHANCED_PROMPT.format(text=pack_text(text, article_token_budget("llama3.1", ENHANCED_PROMPT, 1500)))
     
     try:
-        resp = requests.post(LLM_API_URL, json=payload, timeout=90)
-        resp.raise_for_status()
-        content = resp.json()["choices"][0]["message"]["content"]
+        content = chat("llama3.1", prompt, temperature=0.1, max_tokens=1500, timeout=90,
+                       strategy="enhanced", schema=ARGUMENT_MAP_SCHEMA)
         
         # Extract JSON from response
-        match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-        if not match:
-            return None
-        
-        arg_map = json.loads(match.group(0))
-        
-        # Ensure all keys exist and are lists
-        for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-            if key not in arg_map:
-                arg_map[key] = []
-            elif not isinstance(arg_map[key], list):
-                arg_map[key] = [str(arg_map[key])]
-            # Clean empty strings
-            arg_map[key] = [item.strip() for item in arg_map[key] if item and item.strip()]
-        
-        return arg_map
+        return parse_argument_map(content, get_client().uses_schema("llama3.1"), prompt)
         
     except Exception as e:
         print(f"\n  ⚠️ Error: {e}")
@@ -142,6 +118,9 @@ def main():
     print(f"✓ Saved to: {output_path}")
     print(f"{'='*70}\n")
     
+    get_client().print_latency_report()
+    print_repair_report()
+    
     print("Next step: Run compare_models.py to see the comparison!\n")
 
 if __name__ == "__main__":
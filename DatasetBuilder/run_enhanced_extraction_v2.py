@@ -1,12 +1,11 @@
 # save as 
 
-import requests
 import json
-import re
 import os
 from tqdm import tqdm
-
-LLM_API_URL = "http://localhost:11434/v1/chat/completions"
+from chunking import article_token_budget, pack_text
+from json_extract import ARGUMENT_MAP_SCHEMA, parse_argument_map, print_repair_report
+from llm_client import chat, get_client
 
 # IMPROVED BALANCED PROMPT - Less prescriptive, more effective
 IMPROVED_PROMPT = """You are an expert argument analyst. Extract the core argumentative structure from this news article.
@@ -34,34 +33,13 @@ JSON:"""
 
 def extract_argument_map_improved(text):
     """Extract arguments using improved balanced prompt"""
-    prompt = IMPROVED_PROMPT.format(text=text[:3500])
-    
-    payload = {
-        "model": "llama3.1",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.3,  # Increased from 0.1 for better creativity
-        "max_tokens": 1200,
-    }
+    prompt = IMPROVED_PROMPT.format(text=pack_text(text, article_token_budget("llama3.1", IMPROVED_PROMPT, 1200)))
     
     try:
-        resp = requests.post(LLM_API_URL, json=payload, timeout=90)
-        resp.raise_for_status()
-        content = resp.json()["choices"][0]["message"]["content"]
-        
-        match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-        if not match:
-            return None
+        content = chat("llama3.1", prompt, temperature=0.3, max_tokens=1200, timeout=90,
+                       strategy="improved", schema=ARGUMENT_MAP_SCHEMA)  # temperature increased from 0.1 for better creativity
         
-        arg_map = json.loads(match.group(0))
-        
-        for key in ["thesis", "supporting_claims", "counterarguments", "evidence"]:
-            if key not in arg_map:
-                arg_map[key] = []
-            elif not isinstance(arg_map[key], list):
-                arg_map[key] = [str(arg_map[key])]
-            arg_map[key] = [item.strip() for item in arg_map[key] if item and item.strip()]
-        
-        return arg_map
+        return parse_argument_map(content, get_client().uses_schema("llama3.1"), prompt)
         
     except Exception as e:
         print(f"\n  ⚠️ Error: {e}")
@@ -126,6 +104,9 @@ def main():
         print(f"  Failed IDs: {', '.join(failed)}")
     print(f"✓ Saved to: {output_path}")
     print(f"{'='*70}\n")
+    
+    get_client().print_latency_report()
+    print_repair_report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,41 @@
+import os
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+# How many models the server can keep loaded at once (cf. OLLAMA_MAX_LOADED_MODELS)
+MAX_RESIDENT_MODELS = int(os.environ.get("MAX_RESIDENT_MODELS", "1"))
+
+# ============================================================================
+# MODEL-AFFINITY SCHEDULER
+# ============================================================================
+
+class ModelAffinityScheduler:
+    """Reorder pending LLM jobs so each model's work drains before the next model is requested
+
+    Jobs are grouped by their "model" key in order of first appearance. At
+    most max_resident_models groups run at the same time; the next model is
+    only admitted once a resident one has finished all of its jobs. Callers
+    get results back in the original job order, so outputs do not change.
+    """
+
+    def __init__(self, max_resident_models=MAX_RESIDENT_MODELS):
+        self.max_resident_models = max(1, int(max_resident_models))
+
+    def plan(self, jobs):
+        """Return [(model, [job indices]), ...] in the order models should be loaded"""
+        groups = {}
+        for idx, job in enumerate(jobs):
+            groups.setdefault(job["model"], []).append(idx)
+        return list(groups.items())
+
+    def model_switches(self, jobs):
+        """How many times the requested model changes if jobs run in the given order"""
+        switches = 0
+        previous = None
+        for job in jobs:
+            if job["model"] != previous:
+                switches += 1
+                previous = job["model"]
+        return switches
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+# Minutes a search result list is reused before the search runs again
+SEARCH_CACHE_TTL_MINUTES = float(os.environ.get("SEARCH_CACHE_TTL_MINUTES", "60"))
+# SQLite file to keep results across processes and restarts ("" = memory only)
+SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", "")
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+
+# use     - serve results younger than the TTL, store new ones
+# refresh - always search, overwrite what is cached
+# off     - neither read nor write
+SEARCH_CACHE_MODE = os.environ.get("SEARCH_CACHE_MODE", "use")
+SEARCH_CACHE_MODES = ["use", "refresh", "off"]
+
+_SPACES = re.compile(r"\s+")
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a search query"""
+    return _SPACES.sub(" ", query).strip().lower()
+
+# ============================================================================
+# SEARCH RESULT CACHE
+# ============================================================================
+
+class SearchCache:
+    """TTL cache of web search results, in memory with optional SQLite persistence
+
+    Keyed by (normalized query, source filter, max_results). Memory holds
+    the max_entries most recently used lists; with a path, every list is
+    also written to SQLite, so a restarted server or the next corpus build
+    starts warm. Failed searches are not cached.
+    """
+
+    def __init__(self, ttl_minutes=SEARCH_CACHE_TTL_MINUTES, path=SEARCH_CACHE_PATH,
+                 max_entries=SEARCH_CACHE_MAX_ENTRIES, mode=SEARCH_CACHE_MODE):
+        if mode not in SEARCH_CACHE_MODES:
+            raise ValueError(f"Unknown search cache mode '{mode}', expected one of {SEARCH_CACHE_MODES}")
+
+        self.ttl = ttl_minutes * 60
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.conn = None
+        if path:
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    results TEXT,
+                    stored_at REAL
+                )
+            """)
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(query, source, max_results):
+        return f"{normalize_query(query)}|{(source or '').lower()}|{max_results}"
+
+    def get(self, key):
+        """Cached result list younger than the TTL, or None"""
+        if self.mode != "use":
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is None and self.conn is not None:
+                row = self.conn.execute("SELECT stored_at, results FROM searches WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now - entry[0] >= self.ttl:
+                self.expired += 1
+                self.misses += 1
+                del self.memory[key]
+                return None
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return [dict(result) for result in entry[1]]
+
+    def put(self, key, results):
+        if self.mode == "off":
+            return
+
+        entry = (time.time(), [dict(result) for result in results])
+        with self._lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                self.conn.execute("INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                                  (key, json.dumps(entry[1], ensure_ascii=False), entry[0]))
+                self.conn.commit()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def search(self, query, source, max_results, run):
+        """Results for query (restricted to source, if given), calling run() only on a miss"""
+        key = self.make_key(query, source, max_results)
+        results = self.get(key)
+        if results is None:
+            results = list(run())
+            self.put(key, results)
+        return results
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.memory),
+            }
+
+    def print_report(self):
+        s = self.stats()
+        print(f"\nSearch cache ({s['mode']}): {s['hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate']*100:.1f}% hit rate, {s['expired']} expired), {s['entries']} queries in memory")
+
+# ============================================================================
+# SHARED DEFAULT CACHE
+# ============================================================================
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_search_cache():
+    """Return the process-wide search cache, opening it on first use"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SearchCache()
+        return _default_cache
+
+def set_search_cache_mode(mode):
+    """Switch the shared cache between use / refresh / off"""
+    if mode not in SEARCH_CACHE_MODES:
+        raise ValueError(f"Unknown search cache mode '{mode}', expected one of {SEARCH_CACHE_MODES}")
+    get_search_cache().mode = mode
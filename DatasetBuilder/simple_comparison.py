@@ -1,12 +1,9 @@
-from sentence_transformers import SentenceTransformer, util
 from tqdm import tqdm
 import json
 import numpy as np
 import os
 import glob
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 def main():
     print("\n" + "="*90)
     print("SIMPLE COMPARISON - READING ALL EXTRACTED FILES")
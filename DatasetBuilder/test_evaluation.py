@@ -0,0 +1,48 @@
+import hashlib
+
+import numpy as np
+
+from DatasetBuilder.embedding_store import EmbeddingStore
+from DatasetBuilder.evaluation import (
+    FLOAT16_SCORE_TOLERANCE, SCORE_TOLERANCE, EmbeddingTable, best_scores, best_similarity, cos_sim
+)
+
+class FakeEncoder:
+    """Deterministic 384-d vectors per string, standing in for the sentence encoder"""
+
+    def encode(self, texts, **kwargs):
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+            rows.append(np.random.default_rng(seed).standard_normal(384).astype(np.float32))
+        return np.stack(rows)
+
+def pairwise_similarity(human_list, model_list, encoder):
+    """The unbatched path: every pair scored on its own, in float64"""
+    scores = []
+    for human in human_list:
+        h = encoder.encode([human])[0].astype(np.float64)
+        best = 0.0
+        for item in model_list:
+            m = encoder.encode([item])[0].astype(np.float64)
+            best = max(best, float(h @ m / (np.linalg.norm(h) * np.linalg.norm(m))))
+        scores.append(best)
+    return np.mean(scores)
+
+HUMAN = [f"human claim {i}" for i in range(12)]
+MODEL = [f"model claim {i}" for i in range(9)] + ["human claim 3"]
+
+def test_batched_scores_match_pairwise():
+    encoder = FakeEncoder()
+    expected = pairwise_similarity(HUMAN, MODEL, encoder)
+    assert abs(best_similarity(HUMAN, MODEL, encoder) - expected) <= SCORE_TOLERANCE
+    table = EmbeddingTable(HUMAN + MODEL, encoder)
+    assert abs(table.best_similarity(HUMAN, MODEL) - expected) <= SCORE_TOLERANCE
+
+def test_float16_store_within_tolerance(tmp_path):
+    encoder = FakeEncoder()
+    expected = pairwise_similarity(HUMAN, MODEL, encoder)
+    store = EmbeddingStore("fake", directory=str(tmp_path), dtype="float16")
+    stored = store.encode(HUMAN + MODEL, lambda batch: encoder.encode(batch))
+    score = np.mean(best_scores(cos_sim(stored[:len(HUMAN)], stored[len(HUMAN):])))
+    assert abs(score - expected) <= FLOAT16_SCORE_TOLERANCE
@@ -1,27 +1,10 @@
-from sentence_transformers import SentenceTransformer, util
 from tqdm import tqdm
 import json
 import numpy as np
 import os
 import glob
-
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-def best_similarity(human_list, model_list):
-    """Calculate best semantic similarity"""
-    if not human_list or not model_list:
-        return 0.0
-    scores = []
-    for h in human_list:
-        h_emb = model.encode(h, convert_to_tensor=True)
-        best = 0.0
-        for m in model_list:
-            m_emb = model.encode(m, convert_to_tensor=True)
-            sim = util.pytorch_cos_sim(h_emb, m_emb).item()
-            if sim > best:
-                best = sim
-        scores.append(best)
-    return np.mean(scores) if scores else 0.0
+import time
+from evaluation import EmbeddingTable, argument_strings, best_similarity, print_embedding_report
 
 def load_gold_standard(gold_path):
     """Load gold standard with encoding fix"""
@@ -37,14 +20,20 @@ def load_gold_standard(gold_path):
     print("ERROR: Could not load gold standard!")
     return None
 
-def evaluate_system(file_path, system_name, gold_standard):
-    """Evaluate one system against gold standard"""
+def load_system(file_path):
+    """Output records of one system, or None if the file can't be read"""
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            data = json.load(f)
+            return json.load(f)
     except:
         return None
-    
+
+def score_system(data, gold_standard, embeddings=None):
+    """Scores of one system's records against gold standard
+
+    With an EmbeddingTable every string is looked up instead of encoded.
+    """
+    similarity = embeddings.best_similarity if embeddings is not None else best_similarity
     gold_dict = {e['source_id']: e for e in gold_standard}
     model_dict = {e['source_id']: e for e in data}
     
@@ -58,7 +47,7 @@ def evaluate_system(file_path, system_name, gold_standard):
         pred = model_dict[sid].get('argument_map', {})
         
         for key in scores_dict.keys():
-            sim = best_similarity(gt.get(key, []), pred.get(key, []))
+            sim = similarity(gt.get(key, []), pred.get(key, []))
             scores_dict[key].append(sim)
     
     results = {k: np.mean(v) if v else 0.0 for k, v in scores_dict.items()}
@@ -66,6 +55,29 @@ def evaluate_system(file_path, system_name, gold_standard):
     
     return results
 
+def evaluate_system(file_path, system_name, gold_standard, embeddings=None):
+    """Evaluate one system against gold standard"""
+    data = load_system(file_path)
+    if data is None:
+        return None
+    return score_system(data, gold_standard, embeddings)
+
+def plan_embeddings(gold_standard, systems):
+    """Encode every distinct gold and system string once, up front
+
+    Only articles that are in the gold standard are scored, so only their
+    strings are planned.
+    """
+    gold_dict = {e['source_id']: e for e in gold_standard}
+    strings = []
+    for entry in gold_standard:
+        strings.extend(argument_strings(entry['HUMAN_GROUND_TRUTH']))
+    for data in systems.values():
+        for entry in data:
+            if entry.get('source_id') in gold_dict:
+                strings.extend(argument_strings(entry.get('argument_map', {})))
+    return EmbeddingTable(strings)
+
 def main():
     print("\n" + "="*90)
     print("ULTIMATE COMPARISON: ALL SYSTEMS")
@@ -87,35 +99,44 @@ def main():
     all_scores = {}
     
     # ====================================================================
-    # EVALUATE STATIC SYSTEMS
+    # LOAD SYSTEMS
     # ====================================================================
     
     static_dir = os.path.join(script_dir, 'data/processed/static_models')
     static_files = glob.glob(os.path.join(static_dir, '*.json'))
     
-    print("Evaluating Static Systems (21)...")
-    for filepath in tqdm(static_files, desc="Static"):
-        filename = os.path.basename(filepath)
-        system_name = filename.replace('.json', '').replace('_', ' ').title()
-        scores = evaluate_system(filepath, system_name, gold_standard)
-        if scores:
-            all_scores[f"Static: {system_name}"] = scores
+    agentic_dir = os.path.join(script_dir, 'data/processed/agentic_models')
+    agentic_files = glob.glob(os.path.join(agentic_dir, '*.json'))
+    agentic_files = [f for f in agentic_files if 'decisions' not in f]
+    
+    systems = {}
+    for kind, files in [("Static", static_files), ("Agentic", agentic_files)]:
+        for filepath in files:
+            filename = os.path.basename(filepath)
+            system_name = filename.replace('.json', '').replace('_', ' ').title()
+            data = load_system(filepath)
+            if data is not None:
+                systems[f"{kind}: {system_name}"] = data
     
     # ====================================================================
-    # EVALUATE AGENTIC SYSTEMS
+    # PLAN: ENCODE EVERY UNIQUE STRING ONCE
     # ====================================================================
     
-    agentic_dir = os.path.join(script_dir, 'data/processed/agentic_models')
-    agentic_files = glob.glob(os.path.join(agentic_dir, '*.json'))
-    agentic_files = [f for f in agentic_files if 'decisions' not in f]
+    print(f"Planning embeddings for {len(systems)} systems...")
+    embeddings = plan_embeddings(gold_standard, systems)
+    embeddings.print_report()
+    
+    # ====================================================================
+    # SCORE ALL SYSTEMS FROM THE SHARED MATRIX
+    # ====================================================================
     
-    print("\nEvaluating Agentic Systems (6)...")
-    for filepath in tqdm(agentic_files, desc="Agentic"):
-        filename = os.path.basename(filepath)
-        system_name = filename.replace('.json', '').replace('_', ' ').title()
-        scores = evaluate_system(filepath, system_name, gold_standard)
+    print(f"\nEvaluating Static ({len(static_files)}) and Agentic ({len(agentic_files)}) Systems...")
+    start = time.perf_counter()
+    for name, data in tqdm(systems.items(), desc="Systems"):
+        scores = score_system(data, gold_standard, embeddings)
         if scores:
-            all_scores[f"Agentic: {system_name}"] = scores
+            all_scores[name] = scores
+    print(f"Scored {len(all_scores)} systems in {time.perf_counter() - start:.1f}s")
     
     # ====================================================================
     # SORT AND DISPLAY
@@ -225,6 +246,8 @@ def main():
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(all_scores, f, indent=2, ensure_ascii=False)
     
+    print_embedding_report()
+
     print("\n" + "="*90)
     print("✅ COMPARISON COMPLETE!")
     print("="*90)
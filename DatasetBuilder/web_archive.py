@@ -0,0 +1,240 @@
+import gzip
+import io
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+try:
+    from .http_fetch import FETCH_MAX_BYTES
+except ImportError:  # run as a script from DatasetBuilder/
+    from http_fetch import FETCH_MAX_BYTES
+
+# ============================================================================
+# CONFIGURATION (override with environment variables)
+# ============================================================================
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+WEB_ARCHIVE_PATH = os.environ.get(
+    "WEB_ARCHIVE_PATH", os.path.join(_script_dir, 'data', 'archive', 'pages.warc.gz')
+)
+
+# off    - go to the network as usual
+# record - go to the network and append every exchange to the archive
+# replay - answer from the archive only; a URL it lacks fails like a dead host
+WEB_ARCHIVE_MODE = os.environ.get("WEB_ARCHIVE_MODE", "off")
+WEB_ARCHIVE_MODES = ["off", "record", "replay"]
+
+# Hop-by-hop and encoding headers that no longer describe the stored (decoded) body
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+
+# ============================================================================
+# WARC RECORDS
+# ============================================================================
+
+def _warc_record(warc_type, url, block, record_id, date, concurrent_to=None, content_type="application/http"):
+    headers = [
+        "WARC/1.0",
+        f"WARC-Type: {warc_type}",
+        f"WARC-Record-ID: <urn:uuid:{record_id}>",
+        f"WARC-Date: {date}",
+        f"WARC-Target-URI: {url}",
+    ]
+    if concurrent_to:
+        headers.append(f"WARC-Concurrent-To: <urn:uuid:{concurrent_to}>")
+    headers += [f"Content-Type: {content_type}", f"Content-Length: {len(block)}"]
+    # One gzip member per record, so any record can be read from its offset alone
+    return gzip.compress("\r\n".join(headers).encode("utf-8") + b"\r\n\r\n" + block + b"\r\n\r\n")
+
+def _http_block(start_line, headers, body=b""):
+    lines = [start_line] + [f"{name}: {value}" for name, value in headers]
+    return "\r\n".join(lines).encode("latin-1", errors="replace") + b"\r\n\r\n" + body
+
+def _parse_response_record(data):
+    """(status, reason, [(header, value)], body) of one decompressed response record"""
+    _, _, block = data.partition(b"\r\n\r\n")
+    block = block[:-4] if block.endswith(b"\r\n\r\n") else block
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    _, status, *reason = lines[0].split(" ", 2)
+    headers = [tuple(line.split(": ", 1)) for line in lines[1:] if ": " in line]
+    return int(status), (reason[0] if reason else ""), headers, body
+
+# ============================================================================
+# ARCHIVE
+# ============================================================================
+
+class WebArchive:
+    """Append-only WARC-style archive of HTTP exchanges with a URL index
+
+    Each request and its response are appended as a pair of gzip-compressed
+    WARC records to one .warc.gz file (readable by standard WARC tools); a
+    SQLite index next to it maps every URL to the offset of its latest
+    response, so replay reads exactly one record per request at disk speed.
+    Bodies are stored decoded and capped at FETCH_MAX_BYTES, the most any
+    scraper reads. 304 answers to conditional requests are not recorded.
+    """
+
+    def __init__(self, path=WEB_ARCHIVE_PATH, mode=WEB_ARCHIVE_MODE):
+        if mode not in WEB_ARCHIVE_MODES:
+            raise ValueError(f"Unknown web archive mode '{mode}', expected one of {WEB_ARCHIVE_MODES}")
+
+        self.path = path
+        self.mode = mode
+        self.counts = {"recorded": 0, "replayed": 0, "missing": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _index(self):
+        # Opened on first use, so an archive that is never touched creates no files
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path + ".idx.sqlite", timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER,
+                    offset INTEGER,
+                    length INTEGER,
+                    recorded_at REAL
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def record(self, request, status, reason, headers, body):
+        """Append one request/response exchange and index its response"""
+        date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        request_id, response_id = uuid.uuid4(), uuid.uuid4()
+        path = request.path_url
+        request_block = _http_block(f"{request.method} {path} HTTP/1.1",
+                                    [(k, v) for k, v in request.headers.items()])
+        kept = [(k, v) for k, v in headers if k.lower() not in _DROPPED_HEADERS]
+        kept.append(("Content-Length", str(len(body))))
+        response_block = _http_block(f"HTTP/1.1 {status} {reason}", kept, body)
+
+        request_record = _warc_record("request", request.url, request_block, request_id, date, response_id,
+                                      "application/http; msgtype=request")
+        response_record = _warc_record("response", request.url, response_block, response_id, date, None,
+                                       "application/http; msgtype=response")
+        with self._lock:
+            conn = self._index()
+            with open(self.path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell() + len(request_record)
+                f.write(request_record + response_record)
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                         (request.url, status, offset, len(response_record), time.time()))
+            conn.commit()
+            self.counts["recorded"] += 1
+
+    def lookup(self, url):
+        """(status, reason, headers, body) last recorded for url, or None"""
+        with self._lock:
+            row = self._index().execute("SELECT offset, length FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self.counts["missing"] += 1
+                return None
+            self.counts["replayed"] += 1
+        with open(self.path, "rb") as f:
+            f.seek(row[0])
+            return _parse_response_record(gzip.decompress(f.read(row[1])))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            entries = self._index().execute("SELECT COUNT(*) FROM responses").fetchone()[0] \
+                if self._conn is not None or os.path.exists(self.path + ".idx.sqlite") else 0
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return dict(counts, mode=self.mode, entries=entries, size_mb=size / (1024 * 1024))
+
+    def print_report(self):
+        if self.mode == "off":
+            return
+        s = self.stats()
+        print(f"\nWeb archive ({s['mode']}): {s['recorded']} recorded, {s['replayed']} replayed, "
+              f"{s['missing']} not in archive; {s['entries']} URLs / {s['size_mb']:.1f} MB")
+
+# ============================================================================
+# TRANSPORT ADAPTER
+# ============================================================================
+
+class ArchiveAdapter(HTTPAdapter):
+    """HTTPAdapter that records to or replays from the shared web archive
+
+    Mounted on every scraping session; it consults the archive mode on
+    each request, so set_web_archive_mode() applies to sessions that
+    already exist. Redirects are recorded and replayed hop by hop.
+    """
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        archive = get_web_archive()
+        if archive.mode == "off":
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        if archive.mode == "replay":
+            recorded = archive.lookup(request.url)
+            if recorded is None:
+                raise requests.ConnectionError(f"Not in web archive: {request.url}", request=request)
+            status, reason, headers, body = recorded
+            return self._response(request, status, reason, headers, body)
+
+        response = super().send(request, stream=True, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        chunks = []
+        size = 0
+        try:
+            for chunk in response.raw.stream(64 * 1024, decode_content=True):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= FETCH_MAX_BYTES:
+                    break
+        finally:
+            response.close()
+        body = b"".join(chunks)[:FETCH_MAX_BYTES]
+        headers = list(response.raw.headers.items())
+        if response.status_code != 304:
+            archive.record(request, response.status_code, response.reason or "", headers, body)
+        return self._response(request, response.status_code, response.reason or "", headers, body)
+
+    def _response(self, request, status, reason, headers, body):
+        kept = [(k, v) for k, v in headers if k.lower() not in _DROPPED_HEADERS]
+        kept.append(("Content-Length", str(len(body))))
+        raw = HTTPResponse(body=io.BytesIO(body), headers=kept, status=status, reason=reason,
+                           preload_content=False, decode_content=False, request_url=request.url)
+        return self.build_response(request, raw)
+
+def mount_archive(session, pool_size=None):
+    """Route session's http(s) traffic through the archive adapter"""
+    adapter = ArchiveAdapter(pool_connections=pool_size, pool_maxsize=pool_size) if pool_size else ArchiveAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# ============================================================================
+# SHARED DEFAULT ARCHIVE
+# ============================================================================
+
+_default_archive = None
+_default_lock = threading.Lock()
+
+def get_web_archive():
+    """Return the process-wide web archive"""
+    global _default_archive
+    with _default_lock:
+        if _default_archive is None:
+            _default_archive = WebArchive()
+        return _default_archive
+
+def set_web_archive_mode(mode):
+    """Switch the shared archive between off / record / replay"""
+    if mode not in WEB_ARCHIVE_MODES:
+        raise ValueError(f"Unknown web archive mode '{mode}', expected one of {WEB_ARCHIVE_MODES}")
+    get_web_archive().mode = mode
@@ -1,11 +1,25 @@
 import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from functools import wraps
 import requests
-from bs4 import BeautifulSoup
 from ddgs.ddgs import DDGS
 
+# Shared LLM client and scraping helpers live with the extraction scripts
+from DatasetBuilder.html_extract import extract_title_and_paragraphs
+from DatasetBuilder.http_fetch import fetch_page
+from DatasetBuilder.json_extract import extract_json_object
+from DatasetBuilder.llm_client import LLM_POOL_SIZE, chat, configure_client
+from DatasetBuilder.search_cache import get_search_cache
+from DatasetBuilder.web_archive import mount_archive
+
+# Concurrent /ask requests each hold one model call; start the limiter at the pool size
+# instead of probing up from 1 as the batch runners do
+configure_client(initial_concurrency=LLM_POOL_SIZE)
+
 # --- Flask app setup ---
 app = Flask(__name__)
 CORS(app,
@@ -27,61 +41,113 @@ def ip_whitelist_required(f):
     return decorated_function
 
 # --- Web scraping function ---
-def get_web_context_for_query(query, max_articles=3):
+# Seconds the whole scrape may take; sources still loading then are skipped
+SCRAPE_DEADLINE = float(os.environ.get("SCRAPE_DEADLINE", "12"))
+
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Record / replay with WEB_ARCHIVE_MODE
+scrape_session = mount_archive(requests.Session())
+
+def scrape_source(url, deadline):
+    """(title, text, bytes used) of one news page, reading no longer than the deadline allows"""
+    page = fetch_page(scrape_session, url, headers=SCRAPE_HEADERS, timeout=10,  # ⏱ 10s timeout
+                      body_timeout=max(0.0, deadline - time.monotonic()))
+    title, paragraphs = extract_title_and_paragraphs(page.chunks(), max_paragraphs=None)
+    if page.truncated:
+        print(f"✂️ Read only the first {page.bytes_used // 1024} KB of {url}.")
+    return title, " ".join(paragraphs), page.bytes_used
+
+def get_web_context_for_query(query, max_articles=3, deadline=SCRAPE_DEADLINE, quota=None):
+    """Search the news for query and scrape the results in parallel
+
+    Stops at the deadline (seconds for the whole scrape) or once quota
+    sources (default: all of them) have been scraped, and keeps whatever
+    has finished by then. Returns (context, sources, skipped_urls, timings),
+    where timings has the status, seconds and bytes of every result.
+    """
     print(f"Searching and scraping web for: '{query}'")
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                      "AppleWebKit/537.36 (KHTML, like Gecko) "
-                      "Chrome/91.0.4472.124 Safari/537.36"
-    }
-    combined_context = ""
+    quota = quota or max_articles
     sources = []
     skipped_urls = []
+    timings = []
 
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.news(query=query, max_results=max_articles))
+        def search():
+            with DDGS() as ddgs:
+                return list(ddgs.news(query=query, max_results=max_articles))
+
+        # Repeated questions skip the search round-trip
+        results = get_search_cache().search(query, None, max_articles, search)
 
         if not results:
             print("No news articles found for the query.")
-            return None, None, None
+            return None, None, None, None
 
+        start = time.monotonic()
+        stop_at = start + deadline
+        executor = ThreadPoolExecutor(max_workers=len(results))
+        futures = {}
         for i, result in enumerate(results):
-            url = result['url']
-            print(f"Scraping URL ({i+1}/{max_articles}): {url}")
-            try:
-                response = requests.get(url, headers=headers, timeout=10)  # ⏱ 10s timeout
-                response.raise_for_status()
-
-                soup = BeautifulSoup(response.text, 'lxml')
-                title = soup.find('title').get_text() if soup.find('title') else ''
-                paragraphs = soup.find_all('p')
-                article_text = " ".join([p.get_text() for p in paragraphs])
-
-                combined_context += (
-                    f"--- START OF SOURCE {i+1} ---\n"
-                    f"URL: {url}\nTITLE: {title}\nCONTENT: {article_text}\n"
-                    f"--- END OF SOURCE {i+1} ---\n\n"
-                )
-                sources.append(url)
-
-            except requests.exceptions.Timeout:
-                print(f"⏳ Skipped {url}: request timed out (10s).")
-                skipped_urls.append(url)
-                continue
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️ Could not scrape {url}: {e}")
-                skipped_urls.append(url)
-                continue
-
-        return combined_context if combined_context else None, sources, skipped_urls
+            print(f"Scraping URL ({i+1}/{len(results)}): {result['url']}")
+            futures[executor.submit(scrape_source, result['url'], stop_at)] = i
+
+        scraped = {}
+        pending = set(futures)
+        while pending and len(scraped) < quota:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures[future]
+                url = results[i]['url']
+                seconds = round(time.monotonic() - start, 2)
+                try:
+                    title, article_text, used = future.result()
+                    scraped[i] = (title, article_text)
+                    timings.append({"url": url, "status": "ok", "seconds": seconds, "bytes": used})
+                except requests.exceptions.Timeout:
+                    print(f"⏳ Skipped {url}: request timed out (10s).")
+                    skipped_urls.append(url)
+                    timings.append({"url": url, "status": "timeout", "seconds": seconds, "bytes": 0})
+                except requests.exceptions.RequestException as e:
+                    print(f"⚠️ Could not scrape {url}: {e}")
+                    skipped_urls.append(url)
+                    timings.append({"url": url, "status": "error", "seconds": seconds, "bytes": 0})
+
+        # Don't hold the response for stragglers; their reads stop at the deadline on their own
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in pending:
+            url = results[futures[future]]['url']
+            status = "deadline" if len(scraped) < quota else "not needed"
+            print(f"⏳ Skipped {url}: {status} after {deadline:.0f}s.")
+            skipped_urls.append(url)
+            timings.append({"url": url, "status": status, "seconds": round(time.monotonic() - start, 2),
+                            "bytes": 0})
+
+        # Sources keep their search-result numbering, whatever order they finished in
+        combined_context = ""
+        for i in sorted(scraped):
+            title, article_text = scraped[i]
+            combined_context += (
+                f"--- START OF SOURCE {i+1} ---\n"
+                f"URL: {results[i]['url']}\nTITLE: {title}\nCONTENT: {article_text}\n"
+                f"--- END OF SOURCE {i+1} ---\n\n"
+            )
+            sources.append(results[i]['url'])
+        print(f"Scraped {len(sources)}/{len(results)} sources in {time.monotonic() - start:.1f}s.")
+
+        return combined_context if combined_context else None, sources, skipped_urls, timings
     except Exception as e:
         print(f"An error occurred during the search process: {e}")
-        return None, None, None
+        return None, None, None, None
 
 # --- API and main logic ---
-AI_API_URL = "http://localhost:11434/v1/chat/completions"
-
 @app.route('/', methods=['GET'])
 def homepage():
     return "<h1>Flask API Server is Running!</h1><p>Send a POST request to /ask to interact with the LLM.</p>"
@@ -96,7 +162,7 @@ def ask_model():
     user_question = user_data['question']
     print(f"Received question from allowed IP: {request.remote_addr}")
 
-    context, sources, skipped_urls = get_web_context_for_query(user_question)
+    context, sources, skipped_urls, source_timings = get_web_context_for_query(user_question)
 
     if not context:
         print("Scraping failed or no context found. Aborting request.")
@@ -123,33 +189,23 @@ The 'elements' key must contain a list of objects. Each element object in the li
 Now, analyze the text about "{user_question}" and provide the JSON output.
 """
 
-    api_payload = {
-        "model": "llama3.1",
-        "messages": [{"role": "user", "content": augmented_prompt}],
-        "temperature": 0.2,
-        "max_tokens": 2048,
-    }
-
     try:
-        response = requests.post(AI_API_URL, json=api_payload, timeout=360)  # ⏱ 180s timeout
-        response.raise_for_status()
-        ai_response_data = response.json()
-
-        answer_content_string = ai_response_data['choices'][0]['message']['content']
-
-        # Safe JSON parsing
-        import re
-        import json
-        match = re.search(r"\{.*\}", answer_content_string, re.DOTALL)
-        if not match:
+        answer_content_string = chat("llama3.1", augmented_prompt, temperature=0.2,
+                                     max_tokens=2048, timeout=360,
+                                     strategy="ask", retries=0)  # ⏱ 360s timeout, no retries
+
+        # Safe JSON parsing: the object with the most elements, not everything between the outer braces
+        argument_map_dict = extract_json_object(answer_content_string, mode="best",
+                                                score=lambda obj: len(obj.get("elements") or []))
+        if argument_map_dict is None:
             raise ValueError("No JSON found in AI response")
-        argument_map_dict = json.loads(match.group(0))
 
         return jsonify({
             "data": answer_content_string,
             "argument_map": argument_map_dict,
             "sources": sources,
-            "skipped_urls": skipped_urls
+            "skipped_urls": skipped_urls,
+            "source_timings": source_timings
         })
 
     except requests.exceptions.RequestException as e: